@@ -0,0 +1,78 @@
+"""Compare cache codecs on listing documents.
+
+Run from the repository root:
+
+    python -m benchmarks.codec_benchmark
+"""
+import json
+import random
+import timeit
+from datetime import datetime, timedelta
+from bson import ObjectId
+from utils.codec import JsonCodec, MsgpackCodec, CompressedCodec, lz4
+
+WORDS = "فروش فوری گوشی سالم بدون خط و خش همراه با جعبه و شارژر اصلی قیمت مناسب خواف".split()
+
+def make_listing(description_words: int) -> dict:
+    """Build a listing shaped like the documents in the listings collection."""
+    # Mongo stores datetimes with millisecond precision
+    now = datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    return {
+        '_id': ObjectId(),
+        'user_id': random.randint(10**8, 10**10),
+        'category': 'digital',
+        'title': ' '.join(random.choices(WORDS, k=8)),
+        'description': ' '.join(random.choices(WORDS, k=description_words)),
+        'price': random.randint(0, 10**9),
+        'contact': '09151234567',
+        'location': 'خواف - خیابان امام رضا',
+        'photos': [f"AgACAgQAAxkBAAI{random.getrandbits(96):024x}" for _ in range(3)],
+        'status': 'active',
+        'is_urgent': False,
+        'created_at': now,
+        'expires_at': now + timedelta(days=30),
+        'views': random.randint(0, 5000),
+        'unique_views': random.randint(0, 1000)
+    }
+
+class StdlibJson:
+    # The old Cache.set behaviour; default=str is lossy and only here
+    # to give a baseline, since plain json.dumps fails on these documents
+    def encode(self, value):
+        return json.dumps(value, default=str).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data)
+
+def bench(codec, doc, number: int):
+    """Return (encode µs, decode µs, bytes) per operation."""
+    data = codec.encode(doc)
+    encode = timeit.timeit(lambda: codec.encode(doc), number=number) / number
+    decode = timeit.timeit(lambda: codec.decode(data), number=number) / number
+    return encode * 1e6, decode * 1e6, len(data)
+
+def main():
+    codecs = {
+        'json (stdlib, lossy)': StdlibJson(),
+        'json (extended)': JsonCodec(),
+        'msgpack': MsgpackCodec(),
+        'msgpack+zlib': CompressedCodec(MsgpackCodec(), 'zlib', 1024)
+    }
+    if lz4 is not None:
+        codecs['msgpack+lz4'] = CompressedCodec(MsgpackCodec(), 'lz4', 1024)
+
+    for label, words in (('short listing', 20), ('long listing', 180)):
+        doc = make_listing(words)
+        for codec in codecs.values():
+            if not isinstance(codec, StdlibJson):
+                assert codec.decode(codec.encode(doc)) == doc
+
+        print(f"\n{label}")
+        print(f"{'codec':<22}{'encode µs':>12}{'decode µs':>12}{'bytes':>10}")
+        for name, codec in codecs.items():
+            encode, decode, size = bench(codec, doc, 20000)
+            print(f"{name:<22}{encode:>12.2f}{decode:>12.2f}{size:>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,476 @@
+"""Time every Database method and Cache operation.
+
+Run from the repository root against a local, disposable mongod and
+Redis database:
+
+    python -m benchmarks.db_benchmark --mongo mongodb://localhost:27017 \\
+        --redis redis://localhost:6379/15 --output bench.json
+
+or fully in-process, with mongomock-motor and fakeredis installed:
+
+    python -m benchmarks.db_benchmark --mongo fake --redis fake
+
+The suite seeds users, listings, views, bookmarks and reports, runs
+each operation --iterations times after a warmup, and prints ops/s
+and p50/p95/p99 latencies. Periodic jobs (expiry, archiving, purge,
+report resolution) use up their own work, so they run
+--job-iterations times, each on a fresh batch of --job-batch
+listings prepared outside the timing. --output writes the results as JSON; with
+--baseline it compares against an earlier file and exits non-zero if
+any p50 got slower by more than --threshold. The benchmark database
+is dropped and the Redis database flushed afterwards.
+
+Fakes only model the command semantics, not server performance, and
+may not support every operator; compare fake runs only with fake runs.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from benchmarks.query_plans import seed
+
+BENCH_DB = "divarkhaf_benchmark"
+
+def use_fakes(mongo: bool, redis: bool):
+    """Point the Mongo and Redis client factories at in-process fakes."""
+    if mongo:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient()
+    if redis:
+        import aioredis
+        from fakeredis import FakeServer
+        from fakeredis.aioredis import FakeRedis
+        server = FakeServer()
+        aioredis.from_url = lambda url, decode_responses=False, **kwargs: FakeRedis(
+            server=server,
+            decode_responses=decode_responses
+        )
+
+def percentile(samples: list, fraction: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+async def measure(call, iterations: int, warmup: int, setup=None) -> dict:
+    """Run an awaitable factory and summarize its latencies.
+
+    `setup`, if given, runs before every call and is not timed.
+    """
+    for _ in range(warmup):
+        if setup:
+            await setup()
+        await call()
+
+    timings = []
+    for _ in range(iterations):
+        if setup:
+            await setup()
+        begin = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - begin)
+
+    elapsed = sum(timings)
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000
+    }
+
+async def seed_views(db, users: int, listing_ids: list, views: int):
+    """Insert raw view events, as track_view does without Redis."""
+    now = datetime.utcnow()
+    await db.views.insert_many([{
+        "listing_id": random.choice(listing_ids),
+        "user_id": 10**8 + random.randrange(users),
+        "timestamp": now - timedelta(minutes=random.randint(0, 10**5))
+    } for _ in range(views)])
+
+def new_listing(user_id: int, number: int) -> dict:
+    return {
+        "user_id": user_id,
+        "category": "digital",
+        "title": f"گوشی سامسونگ سالم شماره {number}",
+        "description": "فروش فوری گوشی سالم بدون خط و خش همراه با جعبه و شارژر اصلی",
+        "price": random.randint(10**5, 10**8),
+        "contact": "09151234567",
+        "location": "خواف",
+        "photos": [],
+        "is_urgent": number % 20 == 0
+    }
+
+def database_cases(database, sample: dict, created: list):
+    """Return (name, awaitable factory) for Database methods, in run order.
+
+    Write cases use fresh arguments on every call; delete_listing comes
+    last and works on listings the suite created itself.
+    """
+    from utils.helpers import decode_listing_cursor, encode_listing_cursor
+
+    counter = itertools.count()
+    users = sample["user_ids"]
+    listing_ids = sample["listing_ids"]
+
+    def pick(values):
+        return random.choice(values)
+
+    async def create_listing():
+        listing_id = await database.create_listing(new_listing(pick(users), next(counter)))
+        if listing_id:
+            created.append(listing_id)
+
+    async def get_category_listings():
+        listings, _ = await database.get_category_listings(sample["category"])
+        if listings:
+            cursor = decode_listing_cursor(encode_listing_cursor(listings[-1]))
+            await database.get_category_listings(sample["category"], cursor=cursor)
+
+    async def iter_broadcast_recipients():
+        await database.iter_broadcast_recipients().to_list(length=1000)
+
+    broadcast = {}
+
+    async def update_broadcast():
+        if "id" not in broadcast:
+            broadcast["id"] = await database.create_broadcast({"text": "benchmark"})
+        await database.update_broadcast(broadcast["id"], {"last_user_id": pick(users)})
+
+    async def saved_search_round_trip():
+        user_id = pick(users)
+        search_id = await database.add_saved_search(user_id, "گوشی سامسونگ", "digital")
+        if search_id:
+            await database.delete_saved_search(user_id, search_id)
+
+    async def flush_user_activity():
+        for user_id in users[:500]:
+            database.touch_user(user_id)
+        await database.flush_user_activity()
+
+    async def delete_listing():
+        if created:
+            await database.delete_listing(created.pop())
+
+    return [
+        # Reads
+        ("get_listing", lambda: database.get_listing(pick(listing_ids))),
+        ("get_listings(30)", lambda: database.get_listings(listing_ids[:30])),
+        ("get_user_listings", lambda: database.get_user_listings(pick(users))),
+        ("get_urgent_listings", lambda: database.get_urgent_listings(limit=20)),
+        ("get_category_listings", get_category_listings),
+        ("search_listings", lambda: database.search_listings("گوشی سامسونگ سالم")),
+        ("search_listing_ids", lambda: database.search_listing_ids("گوشی سالم", 200)),
+        ("get_bookmarks", lambda: database.get_bookmarks(sample["bookmark_user_id"], limit=30)),
+        ("get_bookmark_states(30)", lambda: database.get_bookmark_states(
+            sample["bookmark_user_id"], listing_ids[:30]
+        )),
+        ("get_saved_searches", lambda: database.get_saved_searches(pick(users))),
+        ("get_reports(pending)", lambda: database.get_reports(status="pending")),
+        ("get_report_queue", lambda: database.get_report_queue(0, 5)),
+        ("get_listing_stats", lambda: database.get_listing_stats(pick(listing_ids))),
+        ("get_statistics", lambda: database.get_statistics()),
+        ("get_running_broadcasts", lambda: database.get_running_broadcasts()),
+        ("iter_broadcast_recipients(1000)", iter_broadcast_recipients),
+        # Writes
+        ("update_user(unchanged)", lambda: database.update_user({
+            "user_id": users[0], "username": "user0", "first_name": "کاربر", "last_name": None
+        })),
+        ("update_user(changed)", lambda: database.update_user({
+            "user_id": pick(users), "username": f"renamed{next(counter)}", "first_name": "کاربر"
+        })),
+        ("flush_user_activity(500)", flush_user_activity),
+        ("create_listing", create_listing),
+        ("update_listing", lambda: database.update_listing(
+            pick(listing_ids), {"price": random.randint(10**5, 10**8)}
+        )),
+        ("toggle_bookmark", lambda: database.toggle_bookmark(pick(users), pick(listing_ids))),
+        ("add_report", lambda: database.add_report({
+            "listing_id": pick(listing_ids),
+            "listing_title": "آگهی",
+            "reporter_id": 10**9 + next(counter),
+            "reason": pick(["scam", "inappropriate", "false_info", "duplicate"])
+        })),
+        ("track_view", lambda: database.track_view(pick(listing_ids), 10**9 + next(counter))),
+        ("flush_view_counts", lambda: database.flush_view_counts()),
+        ("add_interactions(100)", lambda: database.add_interactions([{
+            "user_id": pick(users),
+            "action": "benchmark",
+            "timestamp": datetime.utcnow()
+        } for _ in range(100)])),
+        ("add/delete_saved_search", saved_search_round_trip),
+        ("mark_user_blocked", lambda: database.mark_user_blocked(pick(users))),
+        ("create_broadcast", lambda: database.create_broadcast({"text": "benchmark"})),
+        ("update_broadcast", update_broadcast),
+        # Periodic jobs
+        ("build_search_index", lambda: database.build_search_index()),
+        ("build_saved_search_index", lambda: database.build_saved_search_index()),
+        ("reconcile_statistics", lambda: database.reconcile_statistics()),
+        # Destructive, on listings created above
+        ("delete_listing", delete_listing)
+    ]
+
+def job_cases(database, batch: int):
+    """Return (name, awaitable factory, setup) for the periodic jobs.
+
+    Each job consumes the work it finds, so a repeated call would time
+    a no-op. setup hands every run exactly `batch` listings to process.
+    """
+    from config import LISTING_ARCHIVE_AFTER_DAYS
+
+    listings = database.listings
+    rejected = []
+    # Reporters and bookmarkers no other case uses, so unique indexes never clash
+    people = itertools.count(2 * 10**9)
+
+    async def make_due(status: str, due: datetime, later: datetime):
+        """Leave exactly `batch` listings of a status due at `due`."""
+        await listings.update_many(
+            {"status": status, "expires_at": {"$lte": due}},
+            {"$set": {"expires_at": later}}
+        )
+        docs = await listings.find({"status": status}, {"_id": 1}).limit(batch).to_list(length=batch)
+        await listings.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in docs]}},
+            {"$set": {"expires_at": due - timedelta(days=1)}}
+        )
+
+    async def active_batch() -> list:
+        docs = await listings.find({"status": "active"}, {"_id": 1}).limit(batch).to_list(length=batch)
+        return [doc["_id"] for doc in docs]
+
+    async def with_dependents(object_ids: list):
+        """Give listings a pending report and a bookmark each."""
+        now = datetime.utcnow()
+        await database.reports.insert_many([{
+            "listing_id": str(object_id),
+            "listing_title": "آگهی",
+            "reporter_id": next(people),
+            "reason": "scam",
+            "status": "pending",
+            "created_at": now
+        } for object_id in object_ids])
+        await database.bookmarks.insert_many([{
+            "user_id": next(people),
+            "listing_id": str(object_id),
+            "created_at": now
+        } for object_id in object_ids])
+
+    async def expiring():
+        now = datetime.utcnow()
+        await make_due("active", now, now + timedelta(days=30))
+
+    async def archivable():
+        now = datetime.utcnow()
+        await make_due("expired", now - timedelta(days=LISTING_ARCHIVE_AFTER_DAYS or 0), now)
+
+    async def tombstoned():
+        object_ids = await active_batch()
+        await with_dependents(object_ids)
+        await listings.update_many(
+            {"_id": {"$in": object_ids}},
+            {"$set": {"status": "deleted", "deleted_at": datetime.utcnow()}}
+        )
+
+    async def reported():
+        object_ids = await active_batch()
+        await with_dependents(object_ids)
+        rejected[:] = [str(object_id) for object_id in object_ids]
+
+    return [
+        ("expire_listings", lambda: database.expire_listings(), expiring),
+        ("archive_expired_listings", lambda: database.archive_expired_listings(), archivable),
+        ("purge_deleted_listings", lambda: database.purge_deleted_listings(), tombstoned),
+        (f"handle_reports(reject, {batch})", lambda: database.handle_reports(rejected, "reject"), reported)
+    ]
+
+def cache_cases(cache, sample_listing: dict):
+    """Return (name, awaitable factory) for Cache operations."""
+    counter = itertools.count()
+    keys = [f"bench:listing:{i}" for i in range(30)]
+    mapping = {key: sample_listing for key in keys}
+    blob = os.urandom(50 * 1024)
+    profile = {"username": "user", "first_name": "کاربر", "last_name": "آزمایشی"}
+
+    async def prepare():
+        await cache.set_many(mapping, 3600)
+        await cache.set_binary("bench:image", blob)
+        await cache.set_hash("bench:hash", profile)
+
+    return prepare, [
+        ("cache.get(hit)", lambda: cache.get(keys[0])),
+        ("cache.get(miss)", lambda: cache.get(f"bench:missing:{next(counter)}")),
+        ("cache.set", lambda: cache.set(f"bench:set:{next(counter) % 1000}", sample_listing)),
+        ("cache.get_many(30)", lambda: cache.get_many(keys)),
+        ("cache.set_many(30)", lambda: cache.set_many(mapping, 3600)),
+        ("cache.delete", lambda: cache.delete(f"bench:set:{next(counter) % 1000}")),
+        ("cache.delete_many(30)", lambda: cache.delete_many(
+            [f"bench:set:{(next(counter) + i) % 1000}" for i in range(30)]
+        )),
+        ("cache.get_binary(50KB)", lambda: cache.get_binary("bench:image")),
+        ("cache.set_binary(50KB)", lambda: cache.set_binary("bench:image", blob)),
+        ("cache.get_hash", lambda: cache.get_hash("bench:hash")),
+        ("cache.set_hash", lambda: cache.set_hash("bench:hash", profile))
+    ]
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(baseline: dict, results: dict, threshold: float) -> list:
+    """Print p50 changes against a baseline; return the regressions."""
+    regressions = []
+    print(f"\n{'operation':<34}{'base p50':>10}{'now p50':>10}{'change':>9}")
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base["p50_ms"]:
+            continue
+        change = result["p50_ms"] / base["p50_ms"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<34}{base['p50_ms']:>10.3f}{result['p50_ms']:>10.3f}{change:>+9.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+async def run(args) -> int:
+    fake_mongo = args.mongo == "fake"
+    fake_redis = args.redis == "fake"
+    try:
+        use_fakes(fake_mongo, fake_redis)
+    except ImportError as e:
+        print(f"In-process fakes need mongomock-motor and fakeredis installed: {e}")
+        return 2
+
+    # Point config at the throwaway database before anything imports it
+    if not fake_mongo:
+        os.environ["DATABASE_URL"] = args.mongo
+    os.environ["DATABASE_NAME"] = BENCH_DB
+    from database import Database
+    from utils.cache import Cache
+
+    cache = Cache(args.redis if not fake_redis else "redis://fake")
+    database = Database(cache)
+    db = database.db
+
+    await database.client.drop_database(BENCH_DB)
+    await cache.redis.flushdb()
+    results = {}
+    try:
+        await cache.start()
+        await database.ensure_indexes()
+        await seed(db, args.users, args.listings)
+        listing_docs = await db.listings.find({"status": "active"}).to_list(length=args.listings)
+        listing_ids = [str(listing["_id"]) for listing in listing_docs]
+        await seed_views(db, args.users, listing_ids, args.views)
+        await database.build_search_index()
+        bookmark = await db.bookmarks.find_one()
+        sample = {
+            "listing_ids": listing_ids[:1000],
+            "user_ids": [10**8 + i for i in range(args.users)],
+            "bookmark_user_id": bookmark["user_id"],
+            "category": listing_docs[0]["category"]
+        }
+
+        # (name, call, setup, iterations, warmup)
+        cases = []
+        if not args.only or args.only == "database":
+            cases += [
+                (name, call, None, args.iterations, args.warmup)
+                for name, call in database_cases(database, sample, created=[])
+            ]
+            cases += [
+                (name, call, setup, args.job_iterations, 1)
+                for name, call, setup in job_cases(database, args.job_batch)
+            ]
+        if not args.only or args.only == "cache":
+            prepare, operations = cache_cases(cache, listing_docs[0])
+            await prepare()
+            cases += [
+                (name, call, None, args.iterations, args.warmup)
+                for name, call in operations
+            ]
+
+        print(f"{'operation':<34}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, call, setup, iterations, warmup in cases:
+            try:
+                result = await measure(call, iterations, warmup, setup)
+            except Exception as e:
+                # Fakes lack some operators; report instead of aborting
+                print(f"{name:<34}  failed: {type(e).__name__}: {e}")
+                continue
+            results[name] = result
+            print(
+                f"{name:<34}{result['ops_per_sec']:>10.0f}{result['p50_ms']:>10.3f}"
+                f"{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            )
+    finally:
+        await cache.stop()
+        await cache.redis.flushdb()
+        await database.client.drop_database(BENCH_DB)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "backend": {"mongo": "fake" if fake_mongo else "mongod", "redis": "fake" if fake_redis else "redis"},
+        "seed": {"users": args.users, "listings": args.listings, "views": args.views},
+        "iterations": args.iterations,
+        "jobs": {"iterations": args.job_iterations, "batch": args.job_batch},
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("backend") != report["backend"]:
+            print("\nBaseline ran on a different backend; not comparing.")
+            return 2
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\nFAILED: {len(regressions)} operations slower than {args.threshold:.0%}")
+            return 1
+        print("\nOK: no regressions")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo", default="mongodb://localhost:27017",
+                        help="mongod URL, or 'fake' for mongomock-motor")
+    parser.add_argument("--redis", default="redis://localhost:6379/15",
+                        help="Redis URL of a disposable database, or 'fake' for fakeredis")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--listings", type=int, default=20000)
+    parser.add_argument("--views", type=int, default=50000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--job-iterations", type=int, default=5,
+                        help="runs of each periodic job, each on fresh data")
+    parser.add_argument("--job-batch", type=int, default=200,
+                        help="listings prepared for each periodic job run")
+    parser.add_argument("--only", choices=["database", "cache"])
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed p50 slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    random.seed(1)
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
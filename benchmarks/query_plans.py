@@ -0,0 +1,238 @@
+"""Assert that every Database query is served by an index.
+
+Run from the repository root against a local, disposable mongod:
+
+    python -m benchmarks.query_plans --mongo mongodb://localhost:27017
+
+The suite seeds a throwaway database with synthetic data, turns on
+the profiler, calls each query method of Database, and re-runs every
+find/aggregate it issued under explain("executionStats"). It exits
+non-zero if a plan contains COLLSCAN or a find examines far more
+documents than it returns. The database is dropped afterwards.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+BENCH_DB = "divarkhaf_query_plans"
+
+# Full scans that are the point of the query
+ALLOWED_COLLSCANS = {
+    "reconcile_statistics": "periodic $facet recount over all listings"
+}
+
+EXPLAINABLE = {"find", "aggregate", "count", "distinct"}
+
+def walk(node, key):
+    """Yield every value stored under `key` anywhere in a document."""
+    if isinstance(node, dict):
+        for name, value in node.items():
+            if name == key:
+                yield value
+            yield from walk(value, key)
+    elif isinstance(node, list):
+        for item in node:
+            yield from walk(item, key)
+
+def plan_stages(explain: dict) -> set:
+    """Collect stage names of the winning plans in an explain result."""
+    stages = set()
+    for plan in walk(explain, "winningPlan"):
+        stages.update(walk(plan, "stage"))
+    return stages
+
+def execution_counts(explain: dict):
+    """Sum documents returned and examined over all execution stats."""
+    returned = examined = 0
+    for stats in walk(explain, "executionStats"):
+        if isinstance(stats, dict) and "nReturned" in stats:
+            returned += stats["nReturned"]
+            examined += stats.get("totalDocsExamined", 0)
+    return returned, examined
+
+def explainable_command(entry: dict):
+    """Rebuild a runnable command from a profiler entry."""
+    command = entry.get("command") or {}
+    name = next(iter(command), None)
+    if name not in EXPLAINABLE:
+        return None
+    return {
+        key: value for key, value in command.items()
+        if not key.startswith("$") and key not in ("lsid", "txnNumber")
+    }
+
+async def seed(db, users: int, listings: int):
+    """Insert synthetic users, listings, reports and bookmarks."""
+    from config import CATEGORIES
+
+    now = datetime.utcnow()
+    categories = list(CATEGORIES.values())
+    await db.users.insert_many([{
+        "user_id": 10**8 + i,
+        "username": f"user{i}",
+        "first_name": "کاربر",
+        "created_at": now - timedelta(days=random.randint(0, 400)),
+        "last_active": now - timedelta(minutes=random.randint(0, 10**5))
+    } for i in range(users)])
+
+    docs = [{
+        "user_id": 10**8 + random.randrange(users),
+        "category": random.choice(categories),
+        "title": "آگهی آزمایشی شماره " + str(i),
+        "description": "توضیحات آزمایشی برای بررسی برنامه اجرای کوئری ها " * 2,
+        "price": random.randint(0, 10**9),
+        "location": "خواف",
+        "status": random.choices(["active", "expired"], [0.8, 0.2])[0],
+        "is_urgent": random.random() < 0.05,
+        "created_at": now - timedelta(seconds=random.randint(0, 90 * 86400)),
+        "expires_at": now + timedelta(days=random.randint(-60, 30))
+    } for i in range(listings)]
+    result = await db.listings.insert_many(docs)
+    listing_ids = [str(listing_id) for listing_id in result.inserted_ids]
+
+    await db.reports.insert_many([{
+        "listing_id": random.choice(listing_ids),
+        "reporter_id": 10**8 + random.randrange(users),
+        "reason": random.choice(["scam", "inappropriate", "false_info", "duplicate"]),
+        "status": random.choices(["pending", "approved", "rejected"], [0.3, 0.3, 0.4])[0],
+        "created_at": now - timedelta(hours=random.randint(0, 2000))
+    } for _ in range(listings // 10)])
+
+    bookmarks = {
+        (10**8 + random.randrange(users), random.choice(listing_ids))
+        for _ in range(listings)
+    }
+    await db.bookmarks.insert_many([{
+        "user_id": user_id,
+        "listing_id": listing_id,
+        "created_at": now - timedelta(hours=random.randint(0, 2000))
+    } for user_id, listing_id in bookmarks])
+
+def query_methods(database, sample: dict):
+    """Return (label, awaitable factory) for every query method."""
+    from utils.helpers import decode_listing_cursor, encode_listing_cursor
+
+    async def category_pages():
+        first, _ = await database.get_category_listings(sample["category"])
+        cursor = decode_listing_cursor(encode_listing_cursor(first[-1]))
+        await database.get_category_listings(sample["category"], cursor=cursor)
+        await database.get_category_listings(sample["category"], cursor=cursor, backward=True)
+
+    async def broadcast_recipients():
+        await database.iter_broadcast_recipients().to_list(length=None)
+        await database.iter_broadcast_recipients(sample["user_id"]).to_list(length=None)
+
+    return [
+        ("get_listing", lambda: database.get_listing(sample["listing_id"])),
+        ("get_listings", lambda: database.get_listings(sample["listing_ids"])),
+        ("get_user_listings", lambda: database.get_user_listings(sample["user_id"])),
+        ("get_urgent_listings", lambda: database.get_urgent_listings(limit=20)),
+        ("get_category_listings", category_pages),
+        ("get_reports(pending)", lambda: database.get_reports(status="pending")),
+        ("get_reports", lambda: database.get_reports()),
+        ("get_report_queue", lambda: database.get_report_queue(0, 5)),
+        ("get_bookmarks", lambda: database.get_bookmarks(sample["bookmark_user_id"], limit=30)),
+        ("get_bookmark_states", lambda: database.get_bookmark_states(
+            sample["bookmark_user_id"], sample["listing_ids"]
+        )),
+        ("toggle_bookmark", lambda: database.toggle_bookmark(
+            sample["bookmark_user_id"], str(sample["listing_id"])
+        )),
+        ("get_statistics", lambda: database.get_statistics()),
+        ("reconcile_statistics", lambda: database.reconcile_statistics()),
+        ("get_running_broadcasts", lambda: database.get_running_broadcasts()),
+        ("iter_broadcast_recipients", broadcast_recipients),
+        ("build_search_index", lambda: database.build_search_index()),
+        ("expire_listings", lambda: database.expire_listings()),
+        ("archive_expired_listings", lambda: database.archive_expired_listings()),
+        ("delete_listings", lambda: database.delete_listings(sample["listing_ids"][:5])),
+        ("purge_deleted_listings", lambda: database.purge_deleted_listings())
+    ]
+
+async def run(args) -> int:
+    # Point config at the throwaway database before anything imports it
+    os.environ["DATABASE_URL"] = args.mongo
+    os.environ["DATABASE_NAME"] = BENCH_DB
+    from database import Database
+
+    database = Database()
+    db = database.db
+    await database.client.drop_database(BENCH_DB)
+    failures = []
+    try:
+        await database.ensure_indexes()
+        await seed(db, args.users, args.listings)
+
+        listing = await db.listings.find_one({"status": "active"})
+        bookmark = await db.bookmarks.find_one()
+        sample_ids = await db.listings.find({}, {"_id": 1}).limit(30).to_list(length=30)
+        sample = {
+            "listing_id": str(listing["_id"]),
+            "listing_ids": [str(doc["_id"]) for doc in sample_ids],
+            "user_id": listing["user_id"],
+            "bookmark_user_id": bookmark["user_id"],
+            "category": listing["category"]
+        }
+
+        await db.command({"profile": 2})
+        last_ts = datetime.min
+        for label, call in query_methods(database, sample):
+            await call()
+            entries = await db.system.profile.find(
+                {"ts": {"$gt": last_ts}}
+            ).sort("ts", 1).to_list(length=None)
+            if entries:
+                last_ts = entries[-1]["ts"]
+            # Let the next method's entries get a later timestamp
+            await asyncio.sleep(0.01)
+
+            for entry in entries:
+                command = explainable_command(entry)
+                if command is None or entry.get("ns", "").endswith("system.profile"):
+                    continue
+
+                explain = await db.command({"explain": command, "verbosity": "executionStats"})
+                stages = plan_stages(explain)
+                returned, examined = execution_counts(explain)
+                name = next(iter(command))
+                print(
+                    f"{label:<28}{name:<10}{command.get(name)!s:<12}"
+                    f"{'+'.join(sorted(stages)):<40}returned {returned:>6}  examined {examined:>6}"
+                )
+
+                if "COLLSCAN" in stages and label not in ALLOWED_COLLSCANS:
+                    failures.append(f"{label}: COLLSCAN on {command.get(name)}")
+                if name == "find" and examined > args.max_ratio * max(returned, 1) + args.slack:
+                    failures.append(
+                        f"{label}: examined {examined} documents to return {returned}"
+                    )
+        await db.command({"profile": 0})
+    finally:
+        await database.client.drop_database(BENCH_DB)
+
+    if failures:
+        print("\nFAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nOK: every query uses an index")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo", default="mongodb://localhost:27017")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--listings", type=int, default=20000)
+    parser.add_argument("--max-ratio", type=float, default=2.0,
+                        help="allowed documents examined per document returned")
+    parser.add_argument("--slack", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(1)
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
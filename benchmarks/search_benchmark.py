@@ -0,0 +1,112 @@
+"""Benchmark the in-process search index against Mongo's $text query.
+
+Run from the repository root:
+
+    python -m benchmarks.search_benchmark --listings 20000
+
+The $text half runs only if --mongo points to a reachable mongod. It
+uses its own throwaway database and drops it afterwards.
+"""
+import argparse
+import random
+import statistics
+import time
+from bson import ObjectId
+from utils.search import SearchIndex
+
+WORDS = (
+    "گوشی سامسونگ آیفون لپ‌تاپ یخچال ماشین لباسشویی پراید پژو آپارتمان "
+    "اجاره فروش فوری سالم نو کارکرده تمیز بدون خط و خش همراه جعبه شارژر "
+    "مبل میز صندلی فرش دوچرخه موتور کتاب لباس کفش بچگانه سگ گربه خدمات "
+    "نظافت تعمیر استخدام فروشنده راننده خواف خیابان امام رضا"
+).split()
+CATEGORIES = ['real_estate', 'digital', 'clothing', 'vehicles', 'home_appliances']
+QUERIES = ["گوشی سامسونگ", "پراید سالم", "اجاره آپارتمان", "یخچال نو", "دوچرخه بچگانه"]
+
+def make_listings(count: int):
+    """Generate active listings with random Persian text."""
+    return [{
+        '_id': ObjectId(),
+        'title': ' '.join(random.choices(WORDS, k=6)),
+        'description': ' '.join(random.choices(WORDS, k=40)),
+        'category': random.choice(CATEGORIES),
+        'price': random.randint(0, 10**9),
+        'is_urgent': random.random() < 0.05,
+        'status': 'active'
+    } for _ in range(count)]
+
+def report(label: str, timings: list):
+    """Print p50/p99 of a list of durations in seconds."""
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<28}p50 {statistics.median(timings) * 1000:8.3f} ms"
+          f"   p99 {p99 * 1000:8.3f} ms")
+
+def bench_index(listings: list, rounds: int):
+    """Time index build and top-10 queries."""
+    index = SearchIndex()
+    started = time.perf_counter()
+    for listing in listings:
+        index.add(listing)
+    print(f"index build: {time.perf_counter() - started:.2f} s for {len(index)} listings")
+
+    timings = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            started = time.perf_counter()
+            index.search(query, limit=10)
+            timings.append(time.perf_counter() - started)
+    report("in-process BM25", timings)
+
+    timings = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            started = time.perf_counter()
+            index.search(query, category='digital', max_price=5 * 10**8, limit=10)
+            timings.append(time.perf_counter() - started)
+    report("in-process BM25 + filters", timings)
+
+def bench_text(listings: list, rounds: int, mongo_url: str):
+    """Time the equivalent $text queries on a local mongod."""
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    client = MongoClient(mongo_url, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command('ping')
+    except PyMongoError as e:
+        print(f"skipping $text benchmark: {e}")
+        return
+
+    db = client['divarkhaf_search_bench']
+    try:
+        db.listings.insert_many(listings)
+        db.listings.create_index([("title", "text"), ("description", "text")])
+
+        timings = []
+        for _ in range(rounds):
+            for query in QUERIES:
+                started = time.perf_counter()
+                list(db.listings.find(
+                    {"$text": {"$search": query}, "status": "active"},
+                    {"score": {"$meta": "textScore"}}
+                ).sort([("score", {"$meta": "textScore"})]).limit(10))
+                timings.append(time.perf_counter() - started)
+        report("mongo $text", timings)
+    finally:
+        client.drop_database(db.name)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--listings', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--mongo', default='mongodb://localhost:27017')
+    args = parser.parse_args()
+
+    random.seed(1)
+    listings = make_listings(args.listings)
+    bench_index(listings, args.rounds)
+    bench_text(listings, args.rounds, args.mongo)
+
+if __name__ == '__main__':
+    main()
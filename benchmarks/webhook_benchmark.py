@@ -0,0 +1,183 @@
+"""Post synthetic updates to a local webhook and measure handling latency.
+
+Run from the repository root:
+
+    python -m benchmarks.webhook_benchmark --updates 2000 --users 200 --work-ms 20 \\
+        --hot-updates 500
+
+Telegram is never contacted: the bot's webhook and identity calls are
+answered locally, and the handler sleeps for --work-ms to stand in for
+the Mongo/Bot API awaits of a real handler. Each run reports throughput,
+p50/p99 latency from POST to handler completion, and how many updates of
+one user were handled out of order.
+
+Traffic is first spread evenly over --users users. A last pass adds
+one hot user who sends --hot-updates messages in a burst, and reports
+the latency of the other users' updates separately: one user's backlog
+must not hold the concurrency slots everyone else needs.
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+import httpx
+from telegram import Update, User
+from telegram.ext import Application, ExtBot, TypeHandler
+from utils.update_processor import PerUserUpdateProcessor
+
+SECRET = "benchmark-secret"
+HOT_USER = 999
+
+class LocalBot(ExtBot):
+    # Answer the calls webhook startup makes without a network round trip
+    async def get_me(self, *args, **kwargs):
+        self._bot_user = User(id=1, first_name="bench", is_bot=True, username="bench_bot")
+        return self._bot_user
+
+    async def set_webhook(self, *args, **kwargs):
+        return True
+
+    async def delete_webhook(self, *args, **kwargs):
+        return True
+
+def free_port() -> int:
+    """Pick an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def make_update(update_id: int, user_id: int, message_id: int) -> dict:
+    """Build the JSON body of a private text message update."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+            "text": "📢 آگهی ها"
+        }
+    }
+
+def even_traffic(args) -> list:
+    """Each user sends its messages one after another, like a real chat."""
+    return [
+        [
+            make_update(i * args.users + user, 1000 + user, i + 1)
+            for i in range(args.updates // args.users)
+        ]
+        for user in range(args.users)
+    ]
+
+def hot_burst(args) -> list:
+    """Messages of one user who floods the bot."""
+    first_id = args.updates + 1
+    return [make_update(first_id + i, HOT_USER, i + 1) for i in range(args.hot_updates)]
+
+async def run(label: str, processor, args, conversations: list, burst: list = ()) -> None:
+    """Run one benchmark pass with the given update processor.
+
+    `burst` is posted all at once before the conversations start; its
+    latencies are left out of the report.
+    """
+    builder = Application.builder().bot(LocalBot("1:benchmark"))
+    if processor is not None:
+        builder = builder.concurrent_updates(processor)
+    application = builder.build()
+
+    posted_at, done_at = {}, {}
+    last_message = {}
+    out_of_order = 0
+
+    async def handle(update: Update, context):
+        nonlocal out_of_order
+        user_id = update.effective_user.id
+        message_id = update.message.message_id
+        # The burst is posted concurrently, so it has no order to keep
+        if user_id != HOT_USER and last_message.get(user_id, 0) > message_id:
+            out_of_order += 1
+        last_message[user_id] = message_id
+        await asyncio.sleep(args.work_ms / 1000)
+        done_at[update.update_id] = time.perf_counter()
+
+    application.add_handler(TypeHandler(Update, handle))
+
+    port = free_port()
+    total = sum(len(messages) for messages in conversations) + len(burst)
+
+    async with application:
+        await application.updater.start_webhook(
+            listen="127.0.0.1",
+            port=port,
+            url_path="bench",
+            webhook_url="https://example.invalid/bench",
+            secret_token=SECRET
+        )
+        await application.start()
+
+        url = f"http://127.0.0.1:{port}/bench"
+        headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+        limits = asyncio.Semaphore(args.clients)
+        started = time.perf_counter()
+
+        async with httpx.AsyncClient() as client:
+            async def post(body):
+                posted_at[body["update_id"]] = time.perf_counter()
+                await client.post(url, json=body, headers=headers)
+
+            async def converse(messages):
+                for body in messages:
+                    async with limits:
+                        await post(body)
+
+            await asyncio.gather(*(post(body) for body in burst))
+            await asyncio.gather(*(converse(messages) for messages in conversations))
+
+        while len(done_at) < total:
+            await asyncio.sleep(0.01)
+        elapsed = max(done_at.values()) - started
+
+        await application.updater.stop()
+        await application.stop()
+
+    hot_ids = {body["update_id"] for body in burst}
+    latencies = sorted(done_at[i] - posted_at[i] for i in posted_at if i not in hot_ids)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<30}{total / elapsed:>10.0f} upd/s"
+        f"   p50 {statistics.median(latencies) * 1000:8.1f} ms"
+        f"   p99 {p99 * 1000:8.1f} ms"
+        f"   out of order {out_of_order}"
+        + ("   (other users)" if hot_ids else "")
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--work-ms", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=50, help="parallel POSTs")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--hot-updates", type=int, default=500,
+                        help="burst from one user in the second pass")
+    args = parser.parse_args()
+
+    conversations = even_traffic(args)
+    await run("sequential", None, args, conversations)
+    await run(
+        f"per-user ({args.concurrency})",
+        PerUserUpdateProcessor(args.concurrency),
+        args,
+        conversations
+    )
+    await run(
+        f"per-user ({args.concurrency}) + hot user",
+        PerUserUpdateProcessor(args.concurrency),
+        args,
+        conversations,
+        burst=hot_burst(args)
+    )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,8 @@
 import os
+import asyncio
 import logging
+import re
+import time
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -7,6 +10,7 @@ from telegram.ext import (
     MessageHandler,
     CallbackQueryHandler,
     ConversationHandler,
+    TypeHandler,
     filters,
 )
 from datetime import datetime
@@ -14,15 +18,53 @@ from dotenv import load_dotenv
 from config import (
     BOT_TOKEN,
     ADMIN_ID,
-    CATEGORIES
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    MAX_CONCURRENT_UPDATES,
+    REDIS_URL,
+    STARTUP_TIMEOUT,
+    URGENT_LIST_LIMIT,
+    CATEGORIES,
+    VIEW_FLUSH_INTERVAL,
+    STATS_RECONCILE_INTERVAL,
+    SEARCH_REBUILD_INTERVAL,
+    EXPIRY_SWEEP_INTERVAL,
+    PERSISTENCE_UPDATE_INTERVAL,
+    PERSISTENCE_TTL,
+    PERSISTENCE_CODEC,
+    CACHE_COMPRESSION,
+    CACHE_COMPRESS_THRESHOLD,
+    FLOOD_LIMITS,
+    FLOOD_WARNING_COOLDOWN,
+    FLOOD_REDIS_RETRY_AFTER,
+    CARD_CACHE_TTL,
+    ALERT_FLUSH_INTERVAL,
+    PRESENCE_RESOLUTION,
+    PRESENCE_RETENTION,
+    PRESENCE_TRIM_INTERVAL,
+    USER_ACTIVITY_FLUSH_INTERVAL
 )
 from database import Database
-from handlers.listing_handler import ListingHandler
+from handlers.listing_handler import ListingHandler, SEARCH_QUERY
 from handlers.admin_handler import AdminHandler
 from handlers.report_handler import ReportHandler
 from handlers.urgent_handler import UrgentListingHandler
+from handlers.inline_handler import InlineHandler
 from utils.cache import Cache
 from utils.analytics import Analytics
+from utils.broadcaster import Broadcaster
+from utils.images import shutdown_image_pipeline
+from utils.update_processor import PerUserUpdateProcessor
+from utils.persistence import RedisPersistence
+from utils.codec import get_codec
+from utils.flood_control import FloodControl
+from utils.listing_cards import ListingCards
+from utils.search_alerts import SearchAlerts
+from utils.presence import Presence
 from utils.language import LanguageHandler
 
 # Enable logging
@@ -32,6 +74,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Characters Telegram allows in a webhook secret token
+WEBHOOK_SECRET_TOKEN = re.compile(r'[A-Za-z0-9_-]{1,256}')
+
+def check_update_settings():
+    """Refuse to start with settings that would break or expose updates."""
+    if BOT_MODE not in ('polling', 'webhook'):
+        raise ValueError(f"BOT_MODE must be 'polling' or 'webhook', not {BOT_MODE!r}")
+    if BOT_MODE != 'webhook':
+        return
+    if not WEBHOOK_URL or not WEBHOOK_URL.startswith('https://'):
+        raise ValueError("BOT_MODE=webhook needs WEBHOOK_URL set to a public https:// URL")
+    # Without a secret anyone who finds the URL can post fake updates
+    if not WEBHOOK_SECRET or not WEBHOOK_SECRET_TOKEN.fullmatch(WEBHOOK_SECRET):
+        raise ValueError(
+            "BOT_MODE=webhook needs WEBHOOK_SECRET of 1-256 characters "
+            "from A-Z, a-z, 0-9, _ and -"
+        )
+
 # States
 MAIN_MENU, CATEGORY_SELECT = range(2)
 
@@ -43,22 +103,43 @@ class DivarKhafBot:
         self.current_time = "2025-07-09 19:23:16"  # Current UTC time
         
         # Initialize cache
-        self.cache = Cache()
+        self.cache = Cache(REDIS_URL)
         
         # Initialize database
         self.db = Database(self.cache)
         
         # Initialize analytics
         self.analytics = Analytics(self.db)
+
+        # Initialize broadcaster
+        self.broadcaster = Broadcaster(self.db)
+
+        # Initialize presence tracking
+        self.presence = Presence(self.cache.redis, PRESENCE_RESOLUTION, PRESENCE_RETENTION)
+
+        # Initialize flood control
+        self.flood_control = FloodControl(
+            self.cache.redis,
+            FLOOD_LIMITS,
+            FLOOD_WARNING_COOLDOWN,
+            FLOOD_REDIS_RETRY_AFTER
+        )
         
+        # Initialize listing card renderer
+        self.cards = ListingCards(self.cache, CARD_CACHE_TTL)
+
+        # Initialize saved search alerts
+        self.search_alerts = SearchAlerts(self.db, self.cards, self.broadcaster.bucket)
+
         # Initialize language handler
         self.lang = LanguageHandler()
         
         # Initialize handlers
-        self.listing_handler = ListingHandler(self.db, self.analytics)
-        self.admin_handler = AdminHandler(self.db, self.analytics)
+        self.listing_handler = ListingHandler(self.db, self.analytics, self.cards)
+        self.admin_handler = AdminHandler(self.db, self.analytics, self.broadcaster, self.presence)
         self.report_handler = ReportHandler(self.db)
-        self.urgent_handler = UrgentListingHandler(self.db, self.analytics)
+        self.urgent_handler = UrgentListingHandler(self.db, self.analytics, self.cards)
+        self.inline_handler = InlineHandler(self.db, self.analytics, self.cards)
         
         # Log startup
         logger.info(f"Bot started at {self.current_time} by user {self.bot_user}")
@@ -97,7 +178,6 @@ class DivarKhafBot:
             'username': user.username,
             'first_name': user.first_name,
             'last_name': user.last_name,
-            'last_active': self.current_time,
             'last_interaction_by': self.bot_user
         })
         
@@ -113,6 +193,13 @@ class DivarKhafBot:
             welcome_message,
             reply_markup=self.create_main_menu_keyboard(is_admin)
         )
+
+        # Deep link from an inline result: /start listing_<id>
+        if context.args and context.args[0].startswith('listing_'):
+            listing = await self.db.get_listing(context.args[0].split('_', 1)[1], viewer_id=user.id)
+            if listing:
+                await self.analytics.track_listing_view(str(listing['_id']), user.id)
+                await self.listing_handler.send_listing(update, context, listing)
         return MAIN_MENU
 
     async def help(self, update: Update, context):
@@ -137,6 +224,10 @@ class DivarKhafBot:
             "🔍 جستجوی آگهی:\n"
             "- از دکمه 'جستجو' استفاده کنید\n"
             "- یا دسته بندی مورد نظر را انتخاب کنید\n\n"
+            "🔔 جستجوی ذخیره شده:\n"
+            "- برای محدوده قیمت بنویسید: قیمت 100000-500000\n"
+            "- دکمه '🔔' زیر نتایج جستجو یا دسته بندی را بزنید\n"
+            "- لیست و حذف با دستور /alerts\n\n"
             "⭐️ نشان کردن آگهی:\n"
             "- روی دکمه '⭐️' در زیر هر آگهی کلیک کنید\n\n"
             "📞 تماس با فروشنده:\n"
@@ -187,6 +278,9 @@ class DivarKhafBot:
         elif text == "👑 پنل مدیریت" and str(user.id) == str(ADMIN_ID):
             return await self.admin_handler.admin_menu(update, context)
 
+        elif text in CATEGORIES:
+            return await self.listing_handler.show_category_listings(update, context)
+
     async def get_bot_status(self, update: Update, context):
         """Get current bot status."""
         status_message = (
@@ -200,10 +294,120 @@ class DivarKhafBot:
         await update.message.reply_text(status_message)
         return MAIN_MENU
 
+    async def post_init(self, application: Application):
+        """Run async startup tasks once the application is initialized."""
+        timings = []
+
+        async def step(name, awaitable):
+            started = time.perf_counter()
+            result = await awaitable
+            timings.append((name, time.perf_counter() - started))
+            return result
+
+        # Fail fast: without MongoDB and Redis every handler would fail
+        try:
+            await step("mongo ping", asyncio.wait_for(self.db.ping(), STARTUP_TIMEOUT))
+            await step("redis ping", asyncio.wait_for(self.cache.ping(), STARTUP_TIMEOUT))
+        except Exception as e:
+            logger.critical(f"Startup aborted, backing service unreachable: {e}")
+            raise
+
+        await step("indexes", self.db.ensure_indexes())
+        await step("cache listener", self.cache.start())
+        self.analytics.start()
+
+        # Warm the structures the first requests hit
+        listings = await step("search index", self.db.build_search_index())
+        await step("saved search index", self.db.build_saved_search_index())
+        await step("urgent listings", self.db.get_urgent_listings(limit=URGENT_LIST_LIMIT))
+
+        # Resume broadcasts interrupted by the last shutdown
+        await step("broadcasts", self.broadcaster.resume_broadcasts(application.bot))
+
+        total = sum(duration for _, duration in timings)
+        logger.info(
+            f"Startup finished in {total * 1000:.0f} ms ({listings} listings indexed): "
+            + ", ".join(f"{name} {duration * 1000:.0f} ms" for name, duration in timings)
+        )
+
+    async def post_shutdown(self, application: Application):
+        """Flush buffered writes before the process exits."""
+        await self.analytics.stop()
+        await self.db.flush_view_counts()
+        await self.db.flush_user_activity()
+        await self.cache.stop()
+        shutdown_image_pipeline()
+
+    async def track_activity(self, update: Update, context):
+        """Middleware: record presence and last_active for every update."""
+        if update.effective_user:
+            await self.presence.touch(update.effective_user.id)
+            self.db.touch_user(update.effective_user.id)
+
+    async def flush_user_activity(self, context):
+        """Periodic job writing coalesced last_active times."""
+        await self.db.flush_user_activity()
+
+    async def flush_view_counts(self, context):
+        """Periodic job moving view counters into listing documents."""
+        await self.db.flush_view_counts()
+
+    async def reconcile_statistics(self, context):
+        """Periodic job correcting drift in the materialized statistics."""
+        await self.db.reconcile_statistics()
+
+    async def rebuild_search_index(self, context):
+        """Periodic job picking up listing changes made by other instances."""
+        await self.db.build_search_index()
+        await self.db.build_saved_search_index()
+
+    async def trim_presence(self, context):
+        """Periodic job dropping users outside the longest online window."""
+        await self.presence.trim()
+
+    async def send_search_alerts(self, context):
+        """Periodic job sending queued saved-search alerts."""
+        await self.search_alerts.send_pending(context.bot)
+
+    async def sweep_expired_listings(self, context):
+        """Periodic job expiring and archiving old listings."""
+        expired = await self.db.expire_listings()
+        archived = await self.db.archive_expired_listings()
+        # Tombstones left behind by a restart during a background cascade
+        await self.db.purge_deleted_listings()
+        if expired or archived:
+            logger.info(f"Expiry sweep: {expired} expired, {archived} archived")
+
     def run(self):
         """Start the bot."""
+        # Fail fast, before connecting anywhere
+        try:
+            check_update_settings()
+        except ValueError as e:
+            logger.critical(f"Startup aborted, invalid configuration: {e}")
+            raise
+
         # Create the Application
-        application = Application.builder().token(BOT_TOKEN).build()
+        application = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
+            .concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
+            .persistence(RedisPersistence(
+                self.cache.binary_redis,
+                get_codec(PERSISTENCE_CODEC, CACHE_COMPRESSION, CACHE_COMPRESS_THRESHOLD),
+                update_interval=PERSISTENCE_UPDATE_INTERVAL,
+                ttl=PERSISTENCE_TTL
+            ))
+            .build()
+        )
+
+        # Record presence for every update, throttled ones included
+        application.add_handler(TypeHandler(Update, self.track_activity), group=-2)
+
+        # Throttle abusive users before any handler or database work
+        application.add_handler(TypeHandler(Update, self.flood_control.check_update), group=-1)
 
         # Add handlers
         application.add_handler(CommandHandler("start", self.start))
@@ -222,22 +426,108 @@ class DivarKhafBot:
                         filters.TEXT & ~filters.COMMAND,
                         self.handle_main_menu
                     )
+                ],
+                SEARCH_QUERY: [
+                    MessageHandler(
+                        filters.TEXT & ~filters.COMMAND,
+                        self.listing_handler.handle_search_query
+                    )
                 ]
             },
-            fallbacks=[CommandHandler('start', self.start)]
+            fallbacks=[CommandHandler('start', self.start)],
+            name="main",
+            persistent=True
         ))
         
+        # Category browsing pages
+        application.add_handler(CallbackQueryHandler(
+            self.listing_handler.handle_category_page,
+            pattern=r'^cpg:'
+        ))
+        application.add_handler(CallbackQueryHandler(
+            self.listing_handler.show_listing_details,
+            pattern=r'^view_'
+        ))
+        application.add_handler(CallbackQueryHandler(
+            self.listing_handler.handle_bookmark,
+            pattern=r'^bookmark_'
+        ))
+
+        # Report moderation queue
+        application.add_handler(CallbackQueryHandler(
+            self.admin_handler.handle_report_queue,
+            pattern=r'^rq:'
+        ))
+
+        # Saved searches
+        application.add_handler(CommandHandler("alerts", self.listing_handler.show_saved_searches))
+        application.add_handler(CallbackQueryHandler(
+            self.listing_handler.handle_save_search,
+            pattern=r'^ssave:'
+        ))
+        application.add_handler(CallbackQueryHandler(
+            self.listing_handler.handle_delete_saved_search,
+            pattern=r'^sdel_'
+        ))
+
         # Add other handlers
         application.add_handler(self.listing_handler.get_handler())
         application.add_handler(self.admin_handler.get_handler())
         application.add_handler(self.report_handler.get_handler())
         application.add_handler(self.urgent_handler.get_handler())
+        application.add_handler(self.inline_handler.get_handler())
+
+        # Periodic jobs
+        application.job_queue.run_repeating(
+            self.flush_view_counts,
+            interval=VIEW_FLUSH_INTERVAL,
+            first=VIEW_FLUSH_INTERVAL
+        )
+        application.job_queue.run_repeating(
+            self.reconcile_statistics,
+            interval=STATS_RECONCILE_INTERVAL,
+            first=0
+        )
+        application.job_queue.run_repeating(
+            self.rebuild_search_index,
+            interval=SEARCH_REBUILD_INTERVAL,
+            first=SEARCH_REBUILD_INTERVAL
+        )
+        application.job_queue.run_repeating(
+            self.sweep_expired_listings,
+            interval=EXPIRY_SWEEP_INTERVAL,
+            first=EXPIRY_SWEEP_INTERVAL
+        )
+        application.job_queue.run_repeating(
+            self.flush_user_activity,
+            interval=USER_ACTIVITY_FLUSH_INTERVAL,
+            first=USER_ACTIVITY_FLUSH_INTERVAL
+        )
+        application.job_queue.run_repeating(
+            self.trim_presence,
+            interval=PRESENCE_TRIM_INTERVAL,
+            first=PRESENCE_TRIM_INTERVAL
+        )
+        application.job_queue.run_repeating(
+            self.send_search_alerts,
+            interval=ALERT_FLUSH_INTERVAL,
+            first=ALERT_FLUSH_INTERVAL
+        )
 
         # Log bot startup
         logger.info(f"Bot initialized at {self.current_time} by {self.bot_user}")
 
         # Start the Bot
-        application.run_polling()
+        if BOT_MODE == 'webhook':
+            application.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=f"{WEBHOOK_URL}/{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET
+            )
+        else:
+            application.run_polling()
 
 if __name__ == '__main__':
     bot = DivarKhafBot()
@@ -8,13 +8,31 @@ load_dotenv()
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 ADMIN_ID = os.getenv('ADMIN_ID')
 
+# Update Settings
+BOT_MODE = os.getenv('BOT_MODE', 'polling')  # 'polling' or 'webhook'
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # public base URL, e.g. https://bot.example.com
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '64'))
+
 # Database Configuration
 DATABASE_URL = os.getenv('DATABASE_URL', 'mongodb://localhost:27017')
 DATABASE_NAME = os.getenv('DATABASE_NAME', 'divarkhaf')
+STARTUP_TIMEOUT = 10  # seconds to reach MongoDB/Redis before giving up
 
 # Redis Configuration
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
 
+# Cache Settings
+CACHE_L1_MAX_SIZE = 5000
+CACHE_L1_TTL = 60  # seconds, upper bound if an invalidation is missed
+CACHE_INVALIDATION_CHANNEL = 'cache:invalidate'
+CACHE_CODEC = 'msgpack'  # or 'json'
+CACHE_COMPRESSION = 'zlib'  # 'lz4', 'zlib' or None
+CACHE_COMPRESS_THRESHOLD = 1024  # bytes
+
 # Collection Names
 COLLECTIONS = {
     'users': 'users',
@@ -23,7 +41,10 @@ COLLECTIONS = {
     'views': 'views',
     'interactions': 'interactions',
     'bookmarks': 'bookmarks',
-    'saved_searches': 'saved_searches'
+    'saved_searches': 'saved_searches',
+    'broadcasts': 'broadcasts',
+    'stats': 'stats',
+    'listings_archive': 'listings_archive'
 }
 
 # Categories
@@ -44,11 +65,109 @@ CATEGORIES = {
 MAX_IMAGES_PER_LISTING = 10
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
 ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png']
+IMAGE_VARIANTS = {
+    'full': (1280, 1280),
+    'thumbnail': (320, 320)
+}
+IMAGE_JPEG_QUALITY = 85
+IMAGE_PROCESS_WORKERS = 2
+IMAGE_QUEUE_SIZE = 16
 
 # Listing Settings
 LISTING_EXPIRY_DAYS = 30
+LISTING_ARCHIVE_AFTER_DAYS = 60  # days after expiry; None keeps expired listings in place
+EXPIRY_SWEEP_INTERVAL = 5 * 60  # seconds
+EXPIRY_SWEEP_BATCH_SIZE = 500
+EXPIRY_SWEEP_MAX_BATCHES = 20  # per run, so one run never hogs the loop
 MAX_LISTINGS_PER_USER = 10
 MIN_TITLE_LENGTH = 10
 MAX_TITLE_LENGTH = 100
 MIN_DESCRIPTION_LENGTH = 30
 MAX_DESCRIPTION_LENGTH = 1000
+LISTINGS_PAGE_SIZE = 8
+BOOKMARKS_LIST_LIMIT = 30
+BOOKMARK_CACHE_TTL = 24 * 60 * 60  # seconds
+URGENT_LIST_LIMIT = 20
+CARD_CACHE_TTL = 60 * 60  # seconds
+
+# Persistence Settings
+PERSISTENCE_UPDATE_INTERVAL = 10  # seconds
+PERSISTENCE_TTL = 30 * 24 * 60 * 60  # seconds
+# user_data may hold tuples and non-str keys, which msgpack/json don't round-trip
+PERSISTENCE_CODEC = 'pickle'
+
+# Flood Control Settings
+# (tokens per second, burst) per user; 'any' applies to every update
+FLOOD_LIMITS = {
+    'any': (2, 20),
+    'message': (1, 10),
+    'callback': (2, 15),
+    'browse': (0.5, 6),
+    'search': (0.2, 4),
+    'view': (1, 10),
+    'bookmark': (1, 10),
+    'report': (0.05, 3),
+    'inline': (1, 10),
+}
+FLOOD_WARNING_COOLDOWN = 10  # seconds between "slow down" notices per user
+FLOOD_REDIS_RETRY_AFTER = 5  # seconds on in-process buckets after a Redis error
+
+# Report Moderation Settings
+REPORT_REASON_WEIGHTS = {
+    'scam': 5,
+    'inappropriate': 3,
+    'false_info': 2,
+    'duplicate': 1,
+}
+REPORT_HIDE_THRESHOLD = 5  # distinct reporters before a listing is hidden
+REPORT_QUEUE_PAGE_SIZE = 5
+REPORT_QUEUE_MESSAGES = 10  # open queue messages whose bulk buttons still work
+
+# User Write Settings
+USER_PROFILE_CACHE_TTL = 24 * 60 * 60  # seconds a profile fingerprint is trusted
+USER_ACTIVITY_FLUSH_INTERVAL = 5  # seconds
+
+# Presence Settings
+PRESENCE_RESOLUTION = 30  # seconds; a user is re-stamped at most this often
+PRESENCE_RETENTION = 24 * 60 * 60  # seconds, the longest online window
+PRESENCE_TRIM_INTERVAL = 10 * 60  # seconds
+ONLINE_WINDOWS = {
+    '۵ دقیقه اخیر': 5 * 60,
+    '۱ ساعت اخیر': 60 * 60,
+    '۲۴ ساعت اخیر': 24 * 60 * 60,
+}
+
+# Broadcast Settings
+BROADCAST_RATE_LIMIT = 28  # messages per second for broadcasts and search alerts together, under Telegram's ~30/s
+BROADCAST_CONCURRENCY = 20
+BROADCAST_CHECKPOINT_INTERVAL = 3  # seconds
+
+# Analytics Settings
+ANALYTICS_QUEUE_SIZE = 10000
+ANALYTICS_BATCH_SIZE = 500
+ANALYTICS_FLUSH_INTERVAL = 2  # seconds
+
+# View Tracking Settings
+VIEW_DEDUP_WINDOW = 10 * 60  # seconds
+VIEW_FLUSH_INTERVAL = 60  # seconds
+VIEW_FLUSH_BATCH_SIZE = 500
+
+# Statistics Settings
+STATS_RECONCILE_INTERVAL = 60 * 60  # seconds
+
+# Search Settings
+SEARCH_RESULTS_LIMIT = 10
+SEARCH_URGENT_BOOST = 1.5
+SEARCH_REBUILD_INTERVAL = 10 * 60  # seconds, picks up other instances' changes
+SEARCH_CACHE_TTL = 60  # seconds a ranked result list is reused
+
+# Saved Search Settings
+SAVED_SEARCH_LIMIT = 10  # per user
+ALERT_FLUSH_INTERVAL = 30  # seconds
+ALERT_BATCH_SIZE = 1000  # pending matches taken per run
+ALERT_MAX_LISTINGS = 5  # listings shown in one alert message
+
+# Inline Mode Settings
+INLINE_PAGE_SIZE = 20  # results per answer, Telegram allows up to 50
+INLINE_MAX_RESULTS = 200
+INLINE_CACHE_TIME = 60  # seconds Telegram caches an answer
@@ -1,17 +1,102 @@
+import asyncio
+import hashlib
 import motor.motor_asyncio
+from bson import ObjectId
+from pymongo import IndexModel, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from datetime import datetime, timedelta
 from config import (
     DATABASE_URL,
     DATABASE_NAME,
     COLLECTIONS,
-    LISTING_EXPIRY_DAYS
+    LISTING_EXPIRY_DAYS,
+    LISTING_ARCHIVE_AFTER_DAYS,
+    EXPIRY_SWEEP_BATCH_SIZE,
+    EXPIRY_SWEEP_MAX_BATCHES,
+    LISTINGS_PAGE_SIZE,
+    VIEW_DEDUP_WINDOW,
+    BOOKMARK_CACHE_TTL,
+    VIEW_FLUSH_BATCH_SIZE,
+    SEARCH_RESULTS_LIMIT,
+    SEARCH_URGENT_BOOST,
+    SEARCH_CACHE_TTL,
+    SAVED_SEARCH_LIMIT,
+    REPORT_REASON_WEIGHTS,
+    REPORT_HIDE_THRESHOLD,
+    USER_PROFILE_CACHE_TTL,
+    STARTUP_TIMEOUT
 )
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
+from utils.view_counter import ViewCounter
+from utils.bookmark_cache import BookmarkCache
+from utils.search import SearchIndex, SavedSearchIndex, tokenize
+
+def visible_to(listing: dict, viewer_id: Optional[int]) -> bool:
+    """Whether a listing may be shown; hidden ones only to their owner."""
+    return listing.get("status") != "hidden" or listing.get("user_id") == viewer_id
+
+def to_object_id(listing_id):
+    """Convert a listing ID string to ObjectId when it is a valid one."""
+    if isinstance(listing_id, str) and ObjectId.is_valid(listing_id):
+        return ObjectId(listing_id)
+    return listing_id
+
+# Listing fields the search index is built from
+SEARCH_FIELDS = {"title", "description", "category", "price", "is_urgent", "status"}
+SEARCH_PROJECTION = {field: 1 for field in SEARCH_FIELDS}
+
+INDEXES = {
+    "users": [
+        IndexModel("user_id", unique=True),
+        IndexModel("username"),
+        IndexModel("last_active"),
+        IndexModel("created_at")
+    ],
+    "listings": [
+        IndexModel("user_id"),
+        # Covers the ID-only lookups that feed get_listings
+        IndexModel([("user_id", 1), ("created_at", -1), ("_id", 1)]),
+        IndexModel([("is_urgent", 1), ("status", 1), ("created_at", -1), ("_id", 1)]),
+        IndexModel("category"),
+        IndexModel("created_at"),
+        IndexModel("is_urgent"),
+        IndexModel("status"),
+        IndexModel([("title", "text"), ("description", "text")]),
+        # Keyset pagination for category browsing
+        IndexModel([("category", 1), ("status", 1), ("created_at", -1), ("_id", -1)]),
+        # Expiry sweeper
+        IndexModel([("status", 1), ("expires_at", 1)])
+    ],
+    "reports": [
+        IndexModel([("listing_id", 1), ("reporter_id", 1)]),
+        IndexModel("reporter_id"),
+        IndexModel("status"),
+        IndexModel([("status", 1), ("created_at", -1)]),
+        IndexModel([("created_at", -1)])
+    ],
+    "views": [
+        IndexModel([("listing_id", 1), ("user_id", 1)]),
+        IndexModel("timestamp")
+    ],
+    "bookmarks": [
+        IndexModel([("user_id", 1), ("listing_id", 1)], unique=True),
+        IndexModel([("user_id", 1), ("created_at", -1)])
+    ],
+    "broadcasts": [
+        IndexModel("status")
+    ],
+    "saved_searches": [
+        IndexModel([("user_id", 1), ("created_at", -1)])
+    ]
+}
 
 class Database:
     def __init__(self, cache=None):
         # Initialize MongoDB connection
-        self.client = motor.motor_asyncio.AsyncIOMotorClient(DATABASE_URL)
+        self.client = motor.motor_asyncio.AsyncIOMotorClient(
+            DATABASE_URL,
+            serverSelectionTimeoutMS=STARTUP_TIMEOUT * 1000
+        )
         self.db = self.client[DATABASE_NAME]
         
         # Initialize collections
@@ -22,145 +107,819 @@ class Database:
         self.interactions = self.db[COLLECTIONS['interactions']]
         self.bookmarks = self.db[COLLECTIONS['bookmarks']]
         self.saved_searches = self.db[COLLECTIONS['saved_searches']]
+        self.broadcasts = self.db[COLLECTIONS['broadcasts']]
+        self.stats = self.db[COLLECTIONS['stats']]
+        self.listings_archive = self.db[COLLECTIONS['listings_archive']]
         
         # Store cache instance
         self.cache = cache
-        
-        # Create indexes
-        self._create_indexes()
-
-    async def _create_indexes(self):
-        """Create necessary database indexes."""
-        # Users indexes
-        await self.users.create_index("user_id", unique=True)
-        await self.users.create_index("username")
-        await self.users.create_index("last_active")
-
-        # Listings indexes
-        await self.listings.create_index("user_id")
-        await self.listings.create_index("category")
-        await self.listings.create_index("created_at")
-        await self.listings.create_index("is_urgent")
-        await self.listings.create_index("status")
-        await self.listings.create_index([("title", "text"), ("description", "text")])
-
-        # Reports indexes
-        await self.reports.create_index("listing_id")
-        await self.reports.create_index("reporter_id")
-        await self.reports.create_index("status")
-
-        # Views indexes
-        await self.views.create_index([("listing_id", 1), ("user_id", 1)])
-        await self.views.create_index("timestamp")
-
-        # Bookmarks indexes
-        await self.bookmarks.create_index([("user_id", 1), ("listing_id", 1)], unique=True)
+
+        # Views are counted in Redis and flushed to listings periodically
+        self.view_counter = ViewCounter(cache.redis, VIEW_DEDUP_WINDOW) if cache else None
+
+        # Per-user sets of bookmarked listing IDs
+        self.bookmark_cache = BookmarkCache(cache.redis, BOOKMARK_CACHE_TTL) if cache else None
+
+        # In-process full text index over active listings
+        self.search_index = SearchIndex(SEARCH_URGENT_BOOST)
+        self.saved_search_index = SavedSearchIndex()
+
+        # last_active per user, coalesced until the next flush
+        self.pending_activity: Dict[int, datetime] = {}
+
+        # Detected on first use; without transactions deletes are tombstoned
+        self.supports_transactions = None
+        self._purge_task = None
+
+    async def ping(self):
+        """Check that MongoDB is reachable; raises if it is not."""
+        await self.client.admin.command("ping")
+
+    async def ensure_indexes(self) -> Dict[str, List[str]]:
+        """Create the indexes in INDEXES; existing ones are left as they are."""
+        collections = list(INDEXES)
+        results = await asyncio.gather(*(
+            self.db[COLLECTIONS[name]].create_indexes(INDEXES[name])
+            for name in collections
+        ))
+        return dict(zip(collections, results))
 
     async def update_user(self, user_data: dict) -> bool:
-        """Update or create user document."""
+        """Update or create user document.
+
+        The profile is only written when it differs from the last one
+        written; last_active is coalesced by touch_user instead, once
+        the upsert has created the document for a new user.
+        """
+        user_data = dict(user_data)
+        user_id = user_data["user_id"]
+        last_active = user_data.pop("last_active", None)
+        if not isinstance(last_active, datetime):
+            last_active = datetime.utcnow()
+
+        fingerprint = hashlib.blake2b(
+            repr(sorted(user_data.items())).encode(),
+            digest_size=16
+        ).hexdigest()
+        key = f"user:fingerprint:{user_id}"
+        if self.cache and await self.cache.get(key) == fingerprint:
+            self.touch_user(user_id, last_active)
+            return True
+
         try:
-            await self.users.update_one(
-                {"user_id": user_data["user_id"]},
+            result = await self.users.update_one(
+                {"user_id": user_id},
                 {
                     "$set": user_data,
                     "$setOnInsert": {"created_at": datetime.utcnow()}
                 },
                 upsert=True
             )
+            self.touch_user(user_id, last_active)
+            if result.upserted_id:
+                await self._bump_stats({"total_users": 1}, {"new_users": 1})
+            if self.cache:
+                await self.cache.set(key, fingerprint, USER_PROFILE_CACHE_TTL)
             return True
         except Exception as e:
             print(f"Error updating user: {e}")
             return False
 
+    def touch_user(self, user_id: int, when: Optional[datetime] = None):
+        """Note a user's activity; written by the next flush_user_activity."""
+        when = when or datetime.utcnow()
+        current = self.pending_activity.get(user_id)
+        if current is None or when > current:
+            self.pending_activity[user_id] = when
+
+    async def flush_user_activity(self) -> int:
+        """Write coalesced last_active times in one bulk write."""
+        pending, self.pending_activity = self.pending_activity, {}
+        if not pending:
+            return 0
+
+        # $max keeps a late flush from another instance from going back
+        # in time; no upsert, users are created by update_user before
+        # their activity is buffered
+        operations = [
+            UpdateOne({"user_id": user_id}, {"$max": {"last_active": when}})
+            for user_id, when in pending.items()
+        ]
+        try:
+            result = await self.users.bulk_write(operations, ordered=False)
+            return result.modified_count
+        except Exception as e:
+            print(f"Error flushing user activity: {e}")
+            for user_id, when in pending.items():
+                self.touch_user(user_id, when)
+            return 0
+
     async def create_listing(self, listing_data: dict) -> Optional[str]:
         """Create a new listing."""
         try:
             listing_data["created_at"] = datetime.utcnow()
+            listing_data["updated_at"] = listing_data["created_at"]
             listing_data["status"] = "active"
             listing_data["expires_at"] = datetime.utcnow() + timedelta(days=LISTING_EXPIRY_DAYS)
             
             result = await self.listings.insert_one(listing_data)
+            self.search_index.add(listing_data)
+            await self._queue_search_alerts(listing_data)
+            await self._bump_stats(
+                self._listing_stats(listing_data, 1),
+                {"new_listings": 1}
+            )
             return str(result.inserted_id)
         except Exception as e:
             print(f"Error creating listing: {e}")
             return None
 
-    async def get_listing(self, listing_id: str) -> Optional[dict]:
-        """Get listing by ID with cache."""
+    async def get_listing(self, listing_id: str, viewer_id: Optional[int] = None) -> Optional[dict]:
+        """Get listing by ID with cache.
+
+        Listings hidden by reports are only returned to their owner,
+        passed as `viewer_id`.
+        """
         if self.cache:
             # Try cache first
             cached_listing = await self.cache.get(f"listing:{listing_id}")
             if cached_listing:
-                return cached_listing
+                return cached_listing if visible_to(cached_listing, viewer_id) else None
 
         # Get from database
-        listing = await self.listings.find_one({"_id": listing_id})
+        listing = await self.listings.find_one({
+            "_id": to_object_id(listing_id),
+            "status": {"$ne": "deleted"}
+        })
         
         if listing and self.cache:
             # Cache for future requests
             await self.cache.set(f"listing:{listing_id}", listing, 3600)
         
-        return listing
+        return listing if listing and visible_to(listing, viewer_id) else None
+
+    async def get_listings(self, listing_ids: List[str], viewer_id: Optional[int] = None) -> List[dict]:
+        """Get several listings by ID in one cache and one DB round trip.
+
+        Listings are returned in the order of `listing_ids`; missing
+        ones, and hidden ones not owned by `viewer_id`, are skipped.
+        """
+        listing_ids = [str(listing_id) for listing_id in listing_ids]
+        if not listing_ids:
+            return []
+
+        found = {}
+        if self.cache:
+            cached = await self.cache.get_many(
+                [f"listing:{listing_id}" for listing_id in listing_ids]
+            )
+            found = {
+                listing_id: listing
+                for listing_id, listing in zip(listing_ids, cached)
+                if listing
+            }
+
+        misses = [listing_id for listing_id in listing_ids if listing_id not in found]
+        if misses:
+            try:
+                cursor = self.listings.find({
+                    "_id": {"$in": [to_object_id(listing_id) for listing_id in misses]},
+                    "status": {"$ne": "deleted"}
+                })
+                fetched = {
+                    str(listing["_id"]): listing
+                    for listing in await cursor.to_list(length=len(misses))
+                }
+            except Exception as e:
+                print(f"Error getting listings: {e}")
+                fetched = {}
+
+            found.update(fetched)
+            if fetched and self.cache:
+                await self.cache.set_many(
+                    {f"listing:{listing_id}": listing for listing_id, listing in fetched.items()},
+                    3600
+                )
+
+        return [
+            found[listing_id] for listing_id in listing_ids
+            if listing_id in found and visible_to(found[listing_id], viewer_id)
+        ]
 
     async def update_listing(self, listing_id: str, update_data: dict) -> bool:
         """Update a listing."""
+        # updated_at versions the listing's rendered cards
+        update_data = dict(update_data, updated_at=datetime.utcnow())
         try:
-            result = await self.listings.update_one(
-                {"_id": listing_id},
-                {"$set": update_data}
-            )
+            # The old document is only needed to adjust counters
+            if "status" in update_data or "is_urgent" in update_data:
+                before = await self.listings.find_one_and_update(
+                    {"_id": to_object_id(listing_id)},
+                    {"$set": update_data},
+                    projection={"status": 1, "is_urgent": 1},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if before:
+                    after = dict(before, **update_data)
+                    changes = self._listing_stats(before, -1)
+                    for key, value in self._listing_stats(after, 1).items():
+                        changes[key] = changes.get(key, 0) + value
+                    await self._bump_stats(changes)
+                modified = before is not None
+            else:
+                result = await self.listings.update_one(
+                    {"_id": to_object_id(listing_id)},
+                    {"$set": update_data}
+                )
+                modified = result.modified_count > 0
+
+            if modified and SEARCH_FIELDS.intersection(update_data):
+                listing = await self.listings.find_one(
+                    {"_id": to_object_id(listing_id)},
+                    SEARCH_PROJECTION
+                )
+                if listing:
+                    self.search_index.add(listing)
             
             # Invalidate cache if exists
             if self.cache:
-                await self.cache.delete(f"listing:{listing_id}")
+                await self.cache.delete_many([f"listing:{listing_id}", f"card:{listing_id}"])
             
-            return result.modified_count > 0
+            return modified
         except Exception as e:
             print(f"Error updating listing: {e}")
             return False
 
     async def delete_listing(self, listing_id: str) -> bool:
         """Delete a listing and its associated data."""
+        return await self.delete_listings([listing_id]) > 0
+
+    async def delete_listings(self, listing_ids: List[str]) -> int:
+        """Delete listings and their reports, views and bookmarks.
+
+        Runs as one transaction when the server supports it. Otherwise
+        the listings are tombstoned (status "deleted", hidden from all
+        reads) and the cascade finishes in the background. Either way
+        the number of round trips does not depend on len(listing_ids).
+        """
+        object_ids = [to_object_id(listing_id) for listing_id in listing_ids]
+        listing_ids = [str(listing_id) for listing_id in listing_ids]
         try:
-            # Delete listing
-            result = await self.listings.delete_one({"_id": listing_id})
-            
-            if result.deleted_count:
-                # Clean up associated data
-                await self.reports.delete_many({"listing_id": listing_id})
-                await self.views.delete_many({"listing_id": listing_id})
-                await self.bookmarks.delete_many({"listing_id": listing_id})
-                
-                # Invalidate cache if exists
-                if self.cache:
-                    await self.cache.delete(f"listing:{listing_id}")
-                
-                return True
-            return False
+            listings = await self.listings.find(
+                {"_id": {"$in": object_ids}, "status": {"$ne": "deleted"}},
+                {"status": 1, "is_urgent": 1}
+            ).to_list(length=None)
+            if not listings:
+                return 0
+
+            changes = {}
+            if await self._transactions_available():
+                async def cascade(session):
+                    await self.listings.delete_many({"_id": {"$in": object_ids}}, session=session)
+                    # Set on every attempt, so a retried transaction counts once
+                    changes["pending_reports"] = -await self._delete_dependents(
+                        listing_ids, session=session
+                    )
+
+                async with await self.client.start_session() as session:
+                    await session.with_transaction(cascade)
+            else:
+                await self.listings.update_many(
+                    {"_id": {"$in": object_ids}},
+                    {"$set": {"status": "deleted", "deleted_at": datetime.utcnow()}}
+                )
+                self._schedule_purge()
+
+            for listing in listings:
+                for key, value in self._listing_stats(listing, -1).items():
+                    changes[key] = changes.get(key, 0) + value
+            await self._bump_stats(changes)
+
+            await self._forget_listings(listing_ids)
+            return len(listings)
         except Exception as e:
-            print(f"Error deleting listing: {e}")
-            return False
+            print(f"Error deleting listings: {e}")
+            return 0
+
+    async def _forget_listings(self, listing_ids: List[str]):
+        """Drop removed listings from the search index, cache and view counters."""
+        for listing_id in listing_ids:
+            self.search_index.remove(listing_id)
+
+        # Invalidate cache if exists
+        if self.cache:
+            await self.cache.delete_many(
+                [f"listing:{listing_id}" for listing_id in listing_ids]
+                + [f"card:{listing_id}" for listing_id in listing_ids]
+            )
+            await self.view_counter.forget(*listing_ids)
+
+    async def _delete_dependents(self, listing_ids: List[str], session=None) -> int:
+        """Delete the reports, views and bookmarks of listings.
+
+        Returns the number of pending reports deleted, which the caller
+        takes off the pending_reports counter.
+        """
+        pending = await self.reports.delete_many(
+            {"listing_id": {"$in": listing_ids}, "status": "pending"},
+            session=session
+        )
+        await self.reports.delete_many({"listing_id": {"$in": listing_ids}}, session=session)
+        await self.views.delete_many({"listing_id": {"$in": listing_ids}}, session=session)
+        await self.bookmarks.delete_many({"listing_id": {"$in": listing_ids}}, session=session)
+        return pending.deleted_count
+
+    async def _transactions_available(self) -> bool:
+        """Check once whether the server is a replica set or mongos."""
+        if self.supports_transactions is None:
+            hello = await self.client.admin.command("hello")
+            self.supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        return self.supports_transactions
+
+    def _schedule_purge(self):
+        """Run purge_deleted_listings in the background unless it is running."""
+        if self._purge_task is None or self._purge_task.done():
+            self._purge_task = asyncio.create_task(self.purge_deleted_listings())
+
+    async def purge_deleted_listings(self) -> int:
+        """Finish the cascade for tombstoned listings."""
+        purged = 0
+        while True:
+            try:
+                cursor = self.listings.find(
+                    {"status": "deleted"},
+                    {"_id": 1}
+                ).limit(EXPIRY_SWEEP_BATCH_SIZE)
+                object_ids = [doc["_id"] for doc in await cursor.to_list(length=None)]
+                if not object_ids:
+                    return purged
+
+                # Dependents first, so a crash leaves the tombstone to retry
+                pending = await self._delete_dependents(
+                    [str(object_id) for object_id in object_ids]
+                )
+                if pending:
+                    await self._bump_stats({"pending_reports": -pending})
+                result = await self.listings.delete_many(
+                    {"_id": {"$in": object_ids}, "status": "deleted"}
+                )
+                purged += result.deleted_count
+            except Exception as e:
+                print(f"Error purging deleted listings: {e}")
+                return purged
+
+    async def expire_listings(self) -> int:
+        """Mark active listings past expires_at as expired, in batches."""
+        expired = 0
+        for _ in range(EXPIRY_SWEEP_MAX_BATCHES):
+            try:
+                cursor = self.listings.find(
+                    {"status": "active", "expires_at": {"$lte": datetime.utcnow()}},
+                    {"_id": 1}
+                ).limit(EXPIRY_SWEEP_BATCH_SIZE)
+                listing_ids = [doc["_id"] for doc in await cursor.to_list(length=None)]
+                if not listing_ids:
+                    break
+
+                result = await self.listings.update_many(
+                    {"_id": {"$in": listing_ids}, "status": "active"},
+                    {"$set": {"status": "expired"}}
+                )
+                await self._bump_stats({"active_listings": -result.modified_count})
+
+                for listing_id in listing_ids:
+                    self.search_index.remove(listing_id)
+                if self.cache:
+                    await self.cache.delete_many(
+                        [f"listing:{listing_id}" for listing_id in listing_ids]
+                    )
+
+                expired += result.modified_count
+                if len(listing_ids) < EXPIRY_SWEEP_BATCH_SIZE:
+                    break
+            except Exception as e:
+                print(f"Error expiring listings: {e}")
+                break
+        return expired
+
+    async def archive_expired_listings(self) -> int:
+        """Move long-expired listings out of the listings collection."""
+        if LISTING_ARCHIVE_AFTER_DAYS is None:
+            return 0
+
+        archived = 0
+        cutoff = datetime.utcnow() - timedelta(days=LISTING_ARCHIVE_AFTER_DAYS)
+        for _ in range(EXPIRY_SWEEP_MAX_BATCHES):
+            try:
+                cursor = self.listings.find(
+                    {"status": "expired", "expires_at": {"$lte": cutoff}}
+                ).limit(EXPIRY_SWEEP_BATCH_SIZE)
+                listings = await cursor.to_list(length=None)
+                if not listings:
+                    break
+
+                try:
+                    await self.listings_archive.insert_many(listings, ordered=False)
+                except BulkWriteError as e:
+                    # Already archived by an earlier run that died before deleting
+                    if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                        raise
+
+                # Dependents before the listings, so a crash leaves the batch to retry
+                listing_ids = [str(listing["_id"]) for listing in listings]
+                pending = await self._delete_dependents(listing_ids)
+                result = await self.listings.delete_many(
+                    {"_id": {"$in": [listing["_id"] for listing in listings]}}
+                )
+                urgent = sum(1 for listing in listings if listing.get("is_urgent"))
+                await self._bump_stats({
+                    "total_listings": -result.deleted_count,
+                    "urgent_listings": -urgent,
+                    "pending_reports": -pending
+                })
+                await self._forget_listings(listing_ids)
+
+                archived += result.deleted_count
+                if len(listings) < EXPIRY_SWEEP_BATCH_SIZE:
+                    break
+            except Exception as e:
+                print(f"Error archiving listings: {e}")
+                break
+        return archived
 
     async def get_user_listings(self, user_id: int) -> List[dict]:
         """Get all listings for a user."""
         try:
-            cursor = self.listings.find({"user_id": user_id}).sort("created_at", -1)
-            return await cursor.to_list(length=None)
+            # IDs come straight from the index; bodies come from get_listings
+            cursor = self.listings.find(
+                {"user_id": user_id},
+                {"_id": 1}
+            ).sort("created_at", -1)
+            listing_ids = [listing["_id"] for listing in await cursor.to_list(length=None)]
+            return await self.get_listings(listing_ids, viewer_id=user_id)
         except Exception as e:
             print(f"Error getting user listings: {e}")
             return []
 
+    async def get_urgent_listings(self, limit: int = 0) -> List[dict]:
+        """Get active urgent listings, newest first."""
+        try:
+            cursor = self.listings.find(
+                {"is_urgent": True, "status": "active"},
+                {"_id": 1}
+            ).sort("created_at", -1).limit(limit)
+            listing_ids = [listing["_id"] for listing in await cursor.to_list(length=None)]
+            return await self.get_listings(listing_ids)
+        except Exception as e:
+            print(f"Error getting urgent listings: {e}")
+            return []
+
+    async def get_category_listings(
+        self,
+        category: str,
+        limit: int = LISTINGS_PAGE_SIZE,
+        cursor: Optional[Tuple[datetime, object]] = None,
+        backward: bool = False
+    ) -> Tuple[List[dict], bool]:
+        """Get one page of active listings in a category, newest first.
+
+        `cursor` is the (created_at, _id) of the first/last card on the
+        current page. Pages are read forward (older) by default, or
+        backward (newer) when `backward` is set. Returns the page and
+        whether more listings exist past it in the read direction.
+        """
+        try:
+            filter_dict = {"category": category, "status": "active"}
+            op = "$gt" if backward else "$lt"
+            if cursor:
+                created_at, last_id = cursor
+                filter_dict["$or"] = [
+                    {"created_at": {op: created_at}},
+                    {"created_at": created_at, "_id": {op: last_id}}
+                ]
+
+            order = 1 if backward else -1
+            cursor_obj = self.listings.find(filter_dict).sort(
+                [("created_at", order), ("_id", order)]
+            ).limit(limit + 1)
+            listings = await cursor_obj.to_list(length=limit + 1)
+
+            has_more = len(listings) > limit
+            listings = listings[:limit]
+            if backward:
+                listings.reverse()
+            return listings, has_more
+        except Exception as e:
+            print(f"Error getting category listings: {e}")
+            return [], False
+
+    async def build_search_index(self) -> int:
+        """(Re)build the search index from all active listings."""
+        try:
+            index = SearchIndex(SEARCH_URGENT_BOOST)
+            cursor = self.listings.find({"status": "active"}, SEARCH_PROJECTION)
+            async for listing in cursor.batch_size(1000):
+                index.add(listing)
+            # Swap in one step so searches never see a half-built index
+            self.search_index = index
+            return len(index)
+        except Exception as e:
+            print(f"Error building search index: {e}")
+            return 0
+
+    async def search_listings(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        limit: int = SEARCH_RESULTS_LIMIT
+    ) -> List[dict]:
+        """Search active listings, best matches first."""
+        results = self.search_index.search(
+            query,
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit
+        )
+        return await self.get_listings([listing_id for listing_id, _ in results])
+
+    async def search_listing_ids(self, query: str, limit: int) -> List[str]:
+        """Rank listing IDs for a query, cached briefly per normalized query."""
+        # BM25 ignores term order and repeats, so neither splits the cache
+        terms = " ".join(sorted(set(tokenize(query))))
+        if not terms:
+            return []
+
+        key = f"search:{limit}:{hashlib.blake2b(terms.encode(), digest_size=16).hexdigest()}"
+        if self.cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        listing_ids = [listing_id for listing_id, _ in self.search_index.search(terms, limit=limit)]
+        if self.cache:
+            await self.cache.set(key, listing_ids, SEARCH_CACHE_TTL)
+        return listing_ids
+
+    async def build_saved_search_index(self) -> int:
+        """(Re)build the saved search index from all saved searches."""
+        try:
+            index = SavedSearchIndex()
+            async for search in self.saved_searches.find().batch_size(1000):
+                index.add(search)
+            self.saved_search_index = index
+            return len(index)
+        except Exception as e:
+            print(f"Error building saved search index: {e}")
+            return 0
+
+    async def add_saved_search(
+        self,
+        user_id: int,
+        query: str = "",
+        category: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None
+    ) -> Optional[str]:
+        """Save a search; None if it is empty or the user is at the limit."""
+        keywords = sorted(set(tokenize(query)))
+        if not (keywords or category or min_price is not None or max_price is not None):
+            return None
+
+        try:
+            if await self.saved_searches.count_documents({"user_id": user_id}) >= SAVED_SEARCH_LIMIT:
+                return None
+
+            search = {
+                "user_id": user_id,
+                "query": query,
+                "keywords": keywords,
+                "category": category,
+                "min_price": min_price,
+                "max_price": max_price,
+                "created_at": datetime.utcnow()
+            }
+            result = await self.saved_searches.insert_one(search)
+            self.saved_search_index.add(search)
+            return str(result.inserted_id)
+        except Exception as e:
+            print(f"Error adding saved search: {e}")
+            return None
+
+    async def get_saved_searches(self, user_id: int) -> List[dict]:
+        """Get a user's saved searches, newest first."""
+        try:
+            cursor = self.saved_searches.find({"user_id": user_id}).sort("created_at", -1)
+            return await cursor.to_list(length=SAVED_SEARCH_LIMIT)
+        except Exception as e:
+            print(f"Error getting saved searches: {e}")
+            return []
+
+    async def delete_saved_search(self, user_id: int, search_id: str) -> bool:
+        """Delete one of a user's saved searches."""
+        try:
+            result = await self.saved_searches.delete_one(
+                {"_id": to_object_id(search_id), "user_id": user_id}
+            )
+            self.saved_search_index.remove(search_id)
+            return result.deleted_count > 0
+        except Exception as e:
+            print(f"Error deleting saved search: {e}")
+            return False
+
+    async def _queue_search_alerts(self, listing: dict):
+        """Queue alerts for the saved searches a new listing matches."""
+        matches = [
+            f"{user_id}:{search_id}:{listing['_id']}"
+            for search_id, user_id in self.saved_search_index.match(listing)
+            if user_id != listing.get("user_id")
+        ]
+        if matches and self.cache:
+            await self.cache.redis.rpush("alerts:pending", *matches)
+
+    async def pop_search_alerts(self, limit: int) -> Dict[int, List[str]]:
+        """Take queued alerts as {user_id: [listing_id, ...]}.
+
+        Alerts of saved searches deleted since they were queued, on
+        this instance or another, are dropped.
+        """
+        try:
+            pipe = self.cache.redis.pipeline(transaction=True)
+            pipe.lrange("alerts:pending", 0, limit - 1)
+            pipe.ltrim("alerts:pending", limit, -1)
+            entries, _ = await pipe.execute()
+        except Exception as e:
+            print(f"Error popping search alerts: {e}")
+            return {}
+        if not entries:
+            return {}
+
+        alerts = [entry.split(":") for entry in entries]
+        try:
+            existing = {
+                str(search["_id"])
+                for search in await self.saved_searches.find(
+                    {"_id": {"$in": list({to_object_id(search_id) for _, search_id, _ in alerts})}},
+                    {"_id": 1}
+                ).to_list(length=None)
+            }
+        except Exception as e:
+            print(f"Error checking saved searches of alerts: {e}")
+            # Put the batch back at the head of the queue for the next run
+            try:
+                await self.cache.redis.lpush("alerts:pending", *reversed(entries))
+            except Exception as e:
+                print(f"Error requeueing search alerts, {len(entries)} lost: {e}")
+            return {}
+
+        by_user: Dict[int, List[str]] = {}
+        for user_id, search_id, listing_id in alerts:
+            listing_ids = by_user.setdefault(int(user_id), [])
+            if search_id in existing and listing_id not in listing_ids:
+                listing_ids.append(listing_id)
+        return {user_id: listing_ids for user_id, listing_ids in by_user.items() if listing_ids}
+
     async def add_report(self, report_data: dict) -> bool:
-        """Add a new report."""
+        """Add a new report; a repeat by the same reporter is ignored.
+
+        Each new report bumps the listing's report_count, and a listing
+        reaching REPORT_HIDE_THRESHOLD is hidden until a moderator
+        decides.
+        """
         try:
             report_data["created_at"] = datetime.utcnow()
             report_data["status"] = "pending"
-            await self.reports.insert_one(report_data)
+            result = await self.reports.update_one(
+                {
+                    "listing_id": report_data["listing_id"],
+                    "reporter_id": report_data["reporter_id"],
+                    "status": "pending"
+                },
+                {"$setOnInsert": report_data},
+                upsert=True
+            )
+            if not result.upserted_id:
+                return True
+
+            await self._bump_stats({"pending_reports": 1})
+            listing = await self.listings.find_one_and_update(
+                {"_id": to_object_id(report_data["listing_id"])},
+                {"$inc": {"report_count": 1}},
+                projection={"report_count": 1, "status": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if (
+                listing
+                and listing["report_count"] >= REPORT_HIDE_THRESHOLD
+                and listing.get("status") == "active"
+            ):
+                await self.update_listing(report_data["listing_id"], {"status": "hidden"})
             return True
         except Exception as e:
             print(f"Error adding report: {e}")
             return False
 
+    async def get_report_queue(self, page: int, page_size: int) -> Tuple[List[dict], int]:
+        """Get one page of reported listings, highest priority first.
+
+        Returns (items, total listings). Each item has the listing_id,
+        title, report counts per reason, their weighted priority and
+        the time of the latest report.
+        """
+        reasons = {
+            reason: {"$sum": {"$cond": [{"$eq": ["$reason", reason]}, 1, 0]}}
+            for reason in REPORT_REASON_WEIGHTS
+        }
+        weight = {"$switch": {
+            "branches": [
+                {"case": {"$eq": ["$reason", reason]}, "then": value}
+                for reason, value in REPORT_REASON_WEIGHTS.items()
+            ],
+            "default": 1
+        }}
+        try:
+            cursor = self.reports.aggregate([
+                {"$match": {"status": "pending"}},
+                {"$group": {
+                    "_id": "$listing_id",
+                    "title": {"$last": "$listing_title"},
+                    "total": {"$sum": 1},
+                    "priority": {"$sum": weight},
+                    "last_reported": {"$max": "$created_at"},
+                    **reasons
+                }},
+                {"$sort": {"priority": -1, "last_reported": -1, "_id": 1}},
+                {"$facet": {
+                    "items": [{"$skip": page * page_size}, {"$limit": page_size}],
+                    "count": [{"$count": "n"}]
+                }}
+            ])
+            result, = await cursor.to_list(length=1)
+            items = [
+                {
+                    "listing_id": item["_id"],
+                    "title": item.get("title"),
+                    "total": item["total"],
+                    "priority": item["priority"],
+                    "last_reported": item["last_reported"],
+                    "reasons": {reason: item[reason] for reason in REPORT_REASON_WEIGHTS}
+                }
+                for item in result["items"]
+            ]
+            total = result["count"][0]["n"] if result["count"] else 0
+            return items, total
+        except Exception as e:
+            print(f"Error getting report queue: {e}")
+            return [], 0
+
+    async def handle_reports(self, listing_ids: List[str], action: str) -> int:
+        """Resolve all pending reports of listings.
+
+        "approve" deletes the listings; "reject" clears their report
+        counters and shows them again if reports had hidden them.
+        Returns the number of reports resolved.
+        """
+        listing_ids = [str(listing_id) for listing_id in listing_ids]
+        try:
+            result = await self.reports.update_many(
+                {"listing_id": {"$in": listing_ids}, "status": "pending"},
+                {"$set": {
+                    "status": "approved" if action == "approve" else "rejected",
+                    "resolved_at": datetime.utcnow()
+                }}
+            )
+            if result.modified_count:
+                await self._bump_stats({"pending_reports": -result.modified_count})
+
+            if action == "approve":
+                await self.delete_listings(listing_ids)
+                return result.modified_count
+
+            object_ids = [to_object_id(listing_id) for listing_id in listing_ids]
+            hidden = await self.listings.find(
+                {"_id": {"$in": object_ids}, "status": "hidden"},
+                {"_id": 1}
+            ).to_list(length=None)
+            await self.listings.update_many(
+                {"_id": {"$in": object_ids}},
+                {"$set": {"report_count": 0}}
+            )
+            for listing in hidden:
+                await self.update_listing(str(listing["_id"]), {"status": "active"})
+            return result.modified_count
+        except Exception as e:
+            print(f"Error handling reports: {e}")
+            return 0
+
+    async def handle_report(self, report_id: str, action: str) -> bool:
+        """Resolve a report together with the other reports of its listing."""
+        report = await self.reports.find_one({"_id": to_object_id(report_id)}, {"listing_id": 1})
+        if not report:
+            return False
+        return await self.handle_reports([report["listing_id"]], action) > 0
+
     async def get_reports(self, status: str = None) -> List[dict]:
         """Get reports with optional status filter."""
         try:
@@ -177,6 +936,9 @@ class Database:
     async def track_view(self, listing_id: str, user_id: int) -> bool:
         """Track a listing view."""
         try:
+            if self.view_counter:
+                return await self.view_counter.record_view(listing_id, user_id)
+
             await self.views.insert_one({
                 "listing_id": listing_id,
                 "user_id": user_id,
@@ -187,70 +949,327 @@ class Database:
             print(f"Error tracking view: {e}")
             return False
 
-    async def toggle_bookmark(self, user_id: int, listing_id: str) -> bool:
-        """Toggle bookmark status for a listing."""
+    async def flush_view_counts(self) -> int:
+        """Move view counts from Redis into listing documents."""
+        if not self.view_counter:
+            return 0
+
+        flushed = 0
+        while True:
+            counts = await self.view_counter.pop_pending(VIEW_FLUSH_BATCH_SIZE)
+            if not counts:
+                return flushed
+
+            batch_size = len(counts)
+            try:
+                await self.listings.bulk_write([
+                    UpdateOne(
+                        {"_id": to_object_id(listing_id)},
+                        {
+                            "$inc": {"views": views},
+                            "$set": {"unique_views": unique_views}
+                        }
+                    )
+                    for listing_id, views, unique_views in counts
+                ], ordered=False)
+                failed = []
+            except BulkWriteError as e:
+                # Unordered: every op without a write error was applied
+                print(f"Error flushing view counts: {e}")
+                failed_indexes = {error["index"] for error in e.details["writeErrors"]}
+                failed = [count for i, count in enumerate(counts) if i in failed_indexes]
+                counts = [count for i, count in enumerate(counts) if i not in failed_indexes]
+            except Exception as e:
+                print(f"Error flushing view counts: {e}")
+                await self.view_counter.restore_pending(counts)
+                return flushed
+
+            if counts:
+                await self._bump_stats(
+                    daily_inc={"views": sum(views for _, views, _ in counts)}
+                )
+            flushed += len(counts)
+            if failed:
+                await self.view_counter.restore_pending(failed)
+                return flushed
+            if batch_size < VIEW_FLUSH_BATCH_SIZE:
+                return flushed
+
+    async def get_listing_stats(self, listing_id: str) -> Dict:
+        """Get view statistics of a listing."""
         try:
-            # Check if bookmark exists
-            existing = await self.bookmarks.find_one({
-                "user_id": user_id,
-                "listing_id": listing_id
-            })
-            
-            if existing:
-                # Remove bookmark
-                await self.bookmarks.delete_one({
-                    "user_id": user_id,
-                    "listing_id": listing_id
-                })
-            else:
-                # Add bookmark
-                await self.bookmarks.insert_one({
-                    "user_id": user_id,
-                    "listing_id": listing_id,
-                    "created_at": datetime.utcnow()
-                })
-            return True
+            listing = await self.listings.find_one(
+                {"_id": to_object_id(listing_id)},
+                {"views": 1, "unique_views": 1}
+            )
+            if not listing:
+                return {}
+
+            stats = {
+                "total_views": listing.get("views", 0),
+                "unique_views": listing.get("unique_views", 0)
+            }
+            if self.view_counter:
+                counts = await self.view_counter.get_counts(listing_id)
+                stats["total_views"] += counts["pending_views"]
+                stats["unique_views"] = counts["unique_views"]
+            return stats
+        except Exception as e:
+            print(f"Error getting listing stats: {e}")
+            return {}
+
+    async def add_interactions(self, interactions: List[dict]) -> int:
+        """Insert a batch of interaction events."""
+        try:
+            # Unordered so one bad document does not stop the rest
+            result = await self.interactions.insert_many(interactions, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            print(f"Error adding interactions: {e.details.get('writeErrors')}")
+            return e.details.get('nInserted', 0)
+        except Exception as e:
+            print(f"Error adding interactions: {e}")
+            return 0
+
+    async def toggle_bookmark(self, user_id: int, listing_id: str) -> Optional[bool]:
+        """Toggle bookmark status for a listing; returns the new status."""
+        try:
+            # One atomic upsert: a new document starts bookmarked, an
+            # existing one flips. Two racing upserts of a new bookmark
+            # collide on the unique index; the retry then flips it.
+            for attempt in range(2):
+                try:
+                    bookmark = await self.bookmarks.find_one_and_update(
+                        {"user_id": user_id, "listing_id": listing_id},
+                        [
+                            {"$set": {"active": {"$cond": [
+                                {"$eq": [{"$type": "$created_at"}, "missing"]},
+                                True,
+                                {"$not": [{"$ifNull": ["$active", True]}]}
+                            ]}}},
+                            {"$set": {"created_at": {"$cond": [
+                                "$active",
+                                "$$NOW",
+                                {"$ifNull": ["$created_at", "$$NOW"]}
+                            ]}}}
+                        ],
+                        projection={"active": 1},
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER
+                    )
+                    break
+                except DuplicateKeyError:
+                    if attempt:
+                        raise
+            bookmarked = bookmark["active"]
+
+            if self.bookmark_cache:
+                await self.bookmark_cache.apply(user_id, listing_id, bookmarked)
+            return bookmarked
         except Exception as e:
             print(f"Error toggling bookmark: {e}")
-            return False
+            return None
+
+    async def get_bookmark_states(self, user_id: int, listing_ids: List[str]) -> List[bool]:
+        """Check which listings a user has bookmarked."""
+        listing_ids = [str(listing_id) for listing_id in listing_ids]
+        if not listing_ids:
+            return []
+
+        try:
+            generation = None
+            if self.bookmark_cache:
+                states = await self.bookmark_cache.contains(user_id, listing_ids)
+                if states is not None:
+                    return states
+                generation = await self.bookmark_cache.generation(user_id)
+
+            cursor = self.bookmarks.find(
+                {"user_id": user_id, "active": {"$ne": False}},
+                {"listing_id": 1}
+            )
+            bookmarked = {bookmark["listing_id"] for bookmark in await cursor.to_list(length=None)}
+            if self.bookmark_cache:
+                await self.bookmark_cache.load(user_id, list(bookmarked), generation)
+            return [listing_id in bookmarked for listing_id in listing_ids]
+        except Exception as e:
+            print(f"Error getting bookmark states: {e}")
+            return [False] * len(listing_ids)
 
-    async def get_bookmarks(self, user_id: int) -> List[dict]:
+    async def get_bookmarks(self, user_id: int, limit: int = 0) -> List[dict]:
         """Get user's bookmarked listings."""
         try:
             # Get bookmark records
-            cursor = self.bookmarks.find({"user_id": user_id})
+            cursor = self.bookmarks.find(
+                {"user_id": user_id, "active": {"$ne": False}},
+                {"listing_id": 1}
+            ).sort("created_at", -1).limit(limit)
             bookmarks = await cursor.to_list(length=None)
             
-            # Get actual listings
-            listings = []
-            for bookmark in bookmarks:
-                listing = await self.get_listing(bookmark["listing_id"])
-                if listing:
-                    listings.append(listing)
-            
-            return listings
+            # Get actual listings in one batch
+            return await self.get_listings(
+                [bookmark["listing_id"] for bookmark in bookmarks]
+            )
         except Exception as e:
             print(f"Error getting bookmarks: {e}")
             return []
 
+    def _listing_stats(self, listing: dict, sign: int) -> Dict[str, int]:
+        """Counter changes for adding (1) or removing (-1) a listing."""
+        changes = {"total_listings": sign}
+        if listing.get("status") == "active":
+            changes["active_listings"] = sign
+        if listing.get("is_urgent"):
+            changes["urgent_listings"] = sign
+        return changes
+
+    async def _bump_stats(self, global_inc: dict = None, daily_inc: dict = None):
+        """Increment the materialized statistics documents."""
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        operations = []
+        if global_inc:
+            operations.append(UpdateOne(
+                {"_id": "global"},
+                {"$inc": global_inc},
+                upsert=True
+            ))
+        if daily_inc:
+            operations.append(UpdateOne(
+                {"_id": f"daily:{today}"},
+                {"$inc": daily_inc},
+                upsert=True
+            ))
+
+        try:
+            if operations:
+                await self.stats.bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Counters drift until the next reconcile_statistics run
+            print(f"Error updating statistics: {e}")
+
     async def get_statistics(self) -> Dict:
         """Get bot usage statistics."""
         try:
-            now = datetime.utcnow()
-            today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            today = datetime.utcnow().strftime("%Y-%m-%d")
+            cursor = self.stats.find({"_id": {"$in": ["global", f"daily:{today}"]}})
+            docs = {doc["_id"]: doc for doc in await cursor.to_list(length=2)}
+            totals = docs.get("global", {})
+            daily = docs.get(f"daily:{today}", {})
             
-            stats = {
-                "total_users": await self.users.count_documents({}),
-                "total_listings": await self.listings.count_documents({}),
-                "active_listings": await self.listings.count_documents({"status": "active"}),
-                "urgent_listings": await self.listings.count_documents({"is_urgent": True}),
-                "today_views": await self.views.count_documents({"timestamp": {"$gte": today}}),
-                "today_new_users": await self.users.count_documents({"created_at": {"$gte": today}}),
-                "today_new_listings": await self.listings.count_documents({"created_at": {"$gte": today}}),
-                "pending_reports": await self.reports.count_documents({"status": "pending"})
+            return {
+                "total_users": totals.get("total_users", 0),
+                "total_listings": totals.get("total_listings", 0),
+                "active_listings": totals.get("active_listings", 0),
+                "urgent_listings": totals.get("urgent_listings", 0),
+                "today_views": daily.get("views", 0),
+                "today_new_users": daily.get("new_users", 0),
+                "today_new_listings": daily.get("new_listings", 0),
+                "pending_reports": totals.get("pending_reports", 0)
             }
-            
-            return stats
         except Exception as e:
             print(f"Error getting statistics: {e}")
             return {}
+
+    async def reconcile_statistics(self) -> bool:
+        """Recount the materialized statistics from the collections."""
+        try:
+            now = datetime.utcnow()
+            today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+            facets = await self.listings.aggregate([
+                {"$facet": {
+                    "active": [{"$match": {"status": "active"}}, {"$count": "n"}],
+                    "urgent": [{"$match": {"is_urgent": True}}, {"$count": "n"}],
+                    "today": [{"$match": {"created_at": {"$gte": today}}}, {"$count": "n"}]
+                }}
+            ]).to_list(length=1)
+            counts = {
+                key: value[0]["n"] if value else 0
+                for key, value in facets[0].items()
+            }
+
+            await self.stats.bulk_write([
+                UpdateOne(
+                    {"_id": "global"},
+                    {"$set": {
+                        "total_users": await self.users.estimated_document_count(),
+                        "total_listings": await self.listings.estimated_document_count(),
+                        "active_listings": counts["active"],
+                        "urgent_listings": counts["urgent"],
+                        "pending_reports": await self.reports.count_documents({"status": "pending"}),
+                        "reconciled_at": now
+                    }},
+                    upsert=True
+                ),
+                UpdateOne(
+                    {"_id": f"daily:{now.strftime('%Y-%m-%d')}"},
+                    {"$set": {
+                        "new_users": await self.users.count_documents({"created_at": {"$gte": today}}),
+                        "new_listings": counts["today"]
+                    }},
+                    upsert=True
+                )
+            ])
+            return True
+        except Exception as e:
+            print(f"Error reconciling statistics: {e}")
+            return False
+
+    def iter_broadcast_recipients(self, after_user_id: Optional[int] = None):
+        """Stream user IDs in user_id order, starting after a checkpoint."""
+        filter_dict = {"blocked": {"$ne": True}}
+        if after_user_id is not None:
+            filter_dict["user_id"] = {"$gt": after_user_id}
+
+        return self.users.find(
+            filter_dict,
+            {"user_id": 1, "_id": 0}
+        ).sort("user_id", 1).batch_size(500)
+
+    async def mark_user_blocked(self, user_id: int) -> bool:
+        """Mark a user who blocked the bot so broadcasts skip them."""
+        try:
+            await self.users.update_one(
+                {"user_id": user_id},
+                {"$set": {"blocked": True}}
+            )
+            return True
+        except Exception as e:
+            print(f"Error marking user blocked: {e}")
+            return False
+
+    async def create_broadcast(self, job_data: dict) -> Optional[str]:
+        """Create a new broadcast job."""
+        try:
+            job_data["created_at"] = datetime.utcnow()
+            job_data["status"] = "running"
+            job_data["last_user_id"] = None
+            job_data.update({"success": 0, "failed": 0, "blocked": 0})
+
+            result = await self.broadcasts.insert_one(job_data)
+            return result.inserted_id
+        except Exception as e:
+            print(f"Error creating broadcast: {e}")
+            return None
+
+    async def update_broadcast(self, job_id, update_data: dict) -> bool:
+        """Checkpoint broadcast progress."""
+        try:
+            update_data["updated_at"] = datetime.utcnow()
+            await self.broadcasts.update_one(
+                {"_id": job_id},
+                {"$set": update_data}
+            )
+            return True
+        except Exception as e:
+            print(f"Error updating broadcast: {e}")
+            return False
+
+    async def get_running_broadcasts(self) -> List[dict]:
+        """Get broadcast jobs that have not finished yet."""
+        try:
+            cursor = self.broadcasts.find({"status": "running"})
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            print(f"Error getting running broadcasts: {e}")
+            return []
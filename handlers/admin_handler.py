@@ -6,17 +6,21 @@ from telegram.ext import (
     ConversationHandler,
     filters,
 )
-from config import ADMIN_ID
+from config import ADMIN_ID, REPORT_QUEUE_PAGE_SIZE, REPORT_QUEUE_MESSAGES, ONLINE_WINDOWS
+from handlers.report_handler import REASON_LABELS
 from datetime import datetime
+from typing import Optional
 
 # Admin panel states
 (ADMIN_MENU, HANDLE_REPORTS, MANAGE_URGENT, BROADCAST_MESSAGE,
  REMOVE_AD, ADD_URGENT, VIEW_STATS, HANDLE_USER) = range(8)
 
 class AdminHandler:
-    def __init__(self, db, analytics):
+    def __init__(self, db, analytics, broadcaster, presence):
         self.db = db
         self.analytics = analytics
+        self.broadcaster = broadcaster
+        self.presence = presence
 
     def is_admin(self, user_id: int) -> bool:
         """Check if user is admin."""
@@ -84,58 +88,121 @@ class AdminHandler:
         await update.message.reply_text(message)
         return ADMIN_MENU
 
-    async def show_reports(self, update: Update, context):
-        """Show reported listings."""
-        reports = await self.db.get_reports(status="pending")
-        
-        if not reports:
-            await update.message.reply_text("🎉 هیچ گزارش تخلفی وجود ندارد!")
+    async def show_online_users(self, update: Update, context):
+        """Show how many users were active in recent windows."""
+        try:
+            counts = await self.presence.count_online(ONLINE_WINDOWS)
+        except Exception as e:
+            print(f"Error counting online users: {e}")
+            await update.message.reply_text("❌ خطا در دریافت کاربران آنلاین.")
             return ADMIN_MENU
 
-        for report in reports:
-            keyboard = [
-                [
-                    InlineKeyboardButton(
-                        "✅ تایید و حذف آگهی",
-                        callback_data=f"approve_report_{report['_id']}"
-                    ),
-                    InlineKeyboardButton(
-                        "❌ رد گزارش",
-                        callback_data=f"reject_report_{report['_id']}"
-                    )
-                ]
-            ]
-            
-            message = (
-                f"🚫 گزارش تخلف:\n\n"
-                f"📢 آگهی: {report.get('listing_title', 'نامشخص')}\n"
-                f"👤 گزارش دهنده: {report.get('reporter_name', 'نامشخص')}\n"
-                f"📝 دلیل: {report.get('reason', 'نامشخص')}\n"
-                f"⏰ زمان گزارش: {report['created_at'].strftime('%Y-%m-%d %H:%M:%S')}"
+        lines = [f"🟢 {window}: {count:,} کاربر" for window, count in counts.items()]
+        await update.message.reply_text("👥 کاربران آنلاین:\n\n" + "\n".join(lines))
+        return ADMIN_MENU
+
+    async def show_reports(self, update: Update, context):
+        """Show the first page of the report queue."""
+        text, markup, shown = await self.build_report_page(0)
+        message = await update.message.reply_text(text, reply_markup=markup)
+        self.remember_report_page(context, message.message_id, shown)
+        return ADMIN_MENU
+
+    def remember_report_page(self, context, message_id: int, shown: Optional[dict]):
+        """Keep what a queue message shows, for its bulk buttons."""
+        # Several queue messages can be open; each acts on its own listings
+        pages = context.user_data.setdefault('report_pages', {})
+        pages.pop(str(message_id), None)
+        if shown:
+            pages[str(message_id)] = shown
+        while len(pages) > REPORT_QUEUE_MESSAGES:
+            pages.pop(next(iter(pages)))
+
+    async def build_report_page(self, page: int):
+        """Build one page of reported listings, highest priority first.
+
+        Returns the text, the keyboard and the page number and listing
+        IDs shown, or None for the latter when the queue is empty.
+        """
+        items, total = await self.db.get_report_queue(page, REPORT_QUEUE_PAGE_SIZE)
+        if not items and page > 0:
+            # The last items of this page were just resolved
+            page = max(0, (total - 1) // REPORT_QUEUE_PAGE_SIZE)
+            items, total = await self.db.get_report_queue(page, REPORT_QUEUE_PAGE_SIZE)
+        if not items:
+            return "🎉 هیچ گزارش تخلفی وجود ندارد!", None, None
+
+        shown = {
+            'page': page,
+            'listing_ids': [item['listing_id'] for item in items]
+        }
+        pages = (total + REPORT_QUEUE_PAGE_SIZE - 1) // REPORT_QUEUE_PAGE_SIZE
+
+        lines = [f"🚫 صف گزارش های تخلف (صفحه {page + 1} از {pages}):"]
+        keyboard = []
+        for index, item in enumerate(items, start=1):
+            reasons = "، ".join(
+                f"{REASON_LABELS.get(reason, reason)}: {count}"
+                for reason, count in item['reasons'].items()
+                if count
             )
-            
-            await update.message.reply_text(
-                message,
-                reply_markup=InlineKeyboardMarkup(keyboard)
+            lines.append(
+                f"{index}. 📢 {item.get('title') or 'نامشخص'}\n"
+                f"🆔 {item['listing_id']}\n"
+                f"🚨 {item['total']} گزارش | اولویت {item['priority']}\n"
+                f"📝 {reasons}"
             )
-        
-        return HANDLE_REPORTS
+            keyboard.append([
+                InlineKeyboardButton(f"✅ {index} حذف آگهی", callback_data=f"rq:a:{item['listing_id']}"),
+                InlineKeyboardButton(f"❌ {index} رد گزارش", callback_data=f"rq:r:{item['listing_id']}")
+            ])
+
+        keyboard.append([
+            InlineKeyboardButton("✅ حذف همه این صفحه", callback_data=f"rq:A:{page}"),
+            InlineKeyboardButton("❌ رد همه این صفحه", callback_data=f"rq:R:{page}")
+        ])
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("« قبلی", callback_data=f"rq:p:{page - 1}"))
+        if page + 1 < pages:
+            nav.append(InlineKeyboardButton("بعدی »", callback_data=f"rq:p:{page + 1}"))
+        if nav:
+            keyboard.append(nav)
+
+        return "\n\n".join(lines), InlineKeyboardMarkup(keyboard), shown
 
-    async def handle_report_action(self, update: Update, context):
-        """Handle report approval or rejection."""
+    async def handle_report_queue(self, update: Update, context):
+        """Handle report queue buttons: paging and single or bulk actions."""
         query = update.callback_query
-        action, report_id = query.data.split('_')[1:]
-        
-        success = await self.db.handle_report(report_id, action)
-        
-        if success:
-            await query.edit_message_text(
-                f"✅ گزارش با موفقیت {'تایید و آگهی حذف شد' if action == 'approve' else 'رد شد'}."
+        if not self.is_admin(update.effective_user.id):
+            await query.answer("⛔️ شما دسترسی به این بخش را ندارید.")
+            return
+
+        _, command, argument = query.data.split(':', 2)
+        message_id = query.message.message_id
+        shown = context.user_data.get('report_pages', {}).get(str(message_id))
+        answer = "✅ انجام شد."
+        if command == 'p':
+            page = int(argument)
+            answer = None
+        elif command in ('a', 'r'):
+            page = shown['page'] if shown else 0
+            await self.db.handle_reports([argument], 'approve' if command == 'a' else 'reject')
+        elif shown and shown['page'] == int(argument):
+            page = shown['page']
+            await self.db.handle_reports(
+                shown['listing_ids'],
+                'approve' if command == 'A' else 'reject'
             )
         else:
-            await query.edit_message_text("❌ خطا در پردازش گزارش.")
-        
-        return ADMIN_MENU
+            # Never act in bulk on listings this message may not show
+            page = int(argument)
+            answer = "⚠️ این صفحه قدیمی است؛ دوباره بررسی و انتخاب کنید."
+
+        await query.answer(answer)
+        text, markup, shown = await self.build_report_page(page)
+        self.remember_report_page(context, message_id, shown)
+        await query.edit_message_text(text, reply_markup=markup)
 
     async def manage_urgent_ads(self, update: Update, context):
         """Manage urgent ads section."""
@@ -161,27 +228,13 @@ class AdminHandler:
         return BROADCAST_MESSAGE
 
     async def broadcast_message(self, update: Update, context):
-        """Send broadcast message to all users."""
+        """Queue a broadcast message to all users."""
         message = update.message.text
-        users = await self.db.get_all_users()
-        success = 0
-        failed = 0
-        
-        for user in users:
-            try:
-                await context.bot.send_message(
-                    chat_id=user['user_id'],
-                    text=f"📢 پیام مدیریت دیوار خواف:\n\n{message}"
-                )
-                success += 1
-            except:
-                failed += 1
-
-        await update.message.reply_text(
-            f"✅ پیام با موفقیت ارسال شد!\n\n"
-            f"📊 نتیجه ارسال:\n"
-            f"✅ موفق: {success}\n"
-            f"❌ ناموفق: {failed}"
+        # The job runs in the background and edits its own progress message
+        await self.broadcaster.start_broadcast(
+            context.bot,
+            update.effective_chat.id,
+            text=f"📢 پیام مدیریت دیوار خواف:\n\n{message}"
         )
         return ADMIN_MENU
 
@@ -196,7 +249,7 @@ class AdminHandler:
     async def remove_ad(self, update: Update, context):
         """Remove specified ad."""
         listing_id = update.message.text
-        result = await self.db.remove_listing(listing_id)
+        result = await self.db.delete_listing(listing_id)
         
         if result:
             await update.message.reply_text("✅ آگهی با موفقیت حذف شد.")
@@ -222,9 +275,9 @@ class AdminHandler:
                     )
                 ],
                 HANDLE_REPORTS: [
-                    CallbackQueryHandler(
-                        self.handle_report_action,
-                        pattern=r'^(approve|reject)_report_\d+'
+                    MessageHandler(
+                        filters.TEXT & ~filters.COMMAND,
+                        self.handle_admin_menu
                     )
                 ],
                 MANAGE_URGENT: [
@@ -251,5 +304,7 @@ class AdminHandler:
                     filters.Regex("^🔙 بازگشت به منوی اصلی$"),
                     lambda u, c: ConversationHandler.END
                 )
-            ]
+            ],
+            name="admin",
+            persistent=True
         )
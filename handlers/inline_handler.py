@@ -0,0 +1,80 @@
+from telegram import (
+    Update,
+    InlineKeyboardMarkup,
+    InlineKeyboardButton,
+    InlineQueryResultArticle,
+    InlineQueryResultCachedPhoto,
+    InputTextMessageContent,
+)
+from telegram.ext import InlineQueryHandler
+from config import INLINE_PAGE_SIZE, INLINE_MAX_RESULTS, INLINE_CACHE_TIME
+
+class InlineHandler:
+    def __init__(self, db, analytics, cards):
+        self.db = db
+        self.analytics = analytics
+        self.cards = cards
+
+    async def handle_inline_query(self, update: Update, context):
+        """Answer `@bot query` with one page of matching listings."""
+        inline_query = update.inline_query
+        offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+
+        if inline_query.query.strip():
+            listing_ids = await self.db.search_listing_ids(inline_query.query, INLINE_MAX_RESULTS)
+        elif offset == 0:
+            # Empty query: show the urgent listings
+            urgent = await self.db.get_urgent_listings(limit=INLINE_PAGE_SIZE)
+            listing_ids = [str(listing['_id']) for listing in urgent]
+        else:
+            listing_ids = []
+
+        page = listing_ids[offset:offset + INLINE_PAGE_SIZE]
+        listings = await self.db.get_listings(page)
+        cards = await self.cards.get_many(listings)
+        next_offset = offset + INLINE_PAGE_SIZE
+        await inline_query.answer(
+            [
+                self.build_result(context.bot.username, listing, card)
+                for listing, card in zip(listings, cards)
+            ],
+            cache_time=INLINE_CACHE_TIME,
+            next_offset=str(next_offset) if next_offset < len(listing_ids) else ""
+        )
+
+        if offset == 0:
+            await self.analytics.track_interaction(
+                update.effective_user.id,
+                'inline_search',
+                {'query': inline_query.query}
+            )
+
+    def build_result(self, bot_username: str, listing: dict, card: dict):
+        """Build the inline result for one listing card."""
+        listing_id = str(listing['_id'])
+        # Inline messages are shared with other chats, so they carry a
+        # link into the bot instead of per-user callback buttons
+        markup = InlineKeyboardMarkup([[InlineKeyboardButton(
+            "🔎 مشاهده در ربات",
+            url=f"https://t.me/{bot_username}?start=listing_{listing_id}"
+        )]])
+        if card['photo']:
+            return InlineQueryResultCachedPhoto(
+                id=listing_id,
+                photo_file_id=card['photo'],
+                title=listing['title'],
+                description=card['summary'],
+                caption=card['photo_caption'],
+                reply_markup=markup
+            )
+        return InlineQueryResultArticle(
+            id=listing_id,
+            title=listing['title'],
+            description=card['summary'],
+            input_message_content=InputTextMessageContent(card['caption']),
+            reply_markup=markup
+        )
+
+    def get_handler(self):
+        """Return the handler for inline queries."""
+        return InlineQueryHandler(self.handle_inline_query)
@@ -6,17 +6,32 @@ from telegram.ext import (
     ConversationHandler,
     filters,
 )
-from config import CATEGORIES, MAX_IMAGES_PER_LISTING
+from config import (
+    CATEGORIES,
+    MAX_IMAGES_PER_LISTING,
+    LISTINGS_PAGE_SIZE,
+    BOOKMARKS_LIST_LIMIT,
+    SAVED_SEARCH_LIMIT
+)
 from datetime import datetime
+from utils.helpers import (
+    encode_listing_cursor,
+    decode_listing_cursor,
+    create_keyboard_markup
+)
+from utils.listing_cards import BOOKMARK_LABELS, join_summaries
+from utils.search import parse_price_range
 
 # States
 (CATEGORY, TITLE, DESCRIPTION, PRICE, CONTACT, 
  LOCATION, PHOTO, CONFIRM) = range(8)
+SEARCH_QUERY = "SEARCH_QUERY"
 
 class ListingHandler:
-    def __init__(self, db, analytics):
+    def __init__(self, db, analytics, cards):
         self.db = db
         self.analytics = analytics
+        self.cards = cards
 
     def create_categories_keyboard(self):
         """Create keyboard with all categories."""
@@ -253,52 +268,307 @@ class ListingHandler:
         )
 
     async def show_category_listings(self, update: Update, context):
-        """Show listings in a category."""
+        """Show the first page of listings in a category."""
         category = update.message.text
         if category not in CATEGORIES:
             return
-            
-        listings = await self.db.get_category_listings(CATEGORIES[category])
+
+        text, markup = await self.build_category_page(
+            CATEGORIES[category],
+            update.effective_user.id
+        )
+        await update.message.reply_text(text, reply_markup=markup)
+
+    async def handle_category_page(self, update: Update, context):
+        """Handle next/prev buttons of a category page."""
+        query = update.callback_query
+        await query.answer()
+
+        _, direction, category, cursor = query.data.split(':', 3)
+        text, markup = await self.build_category_page(
+            category,
+            update.effective_user.id,
+            cursor=decode_listing_cursor(cursor),
+            backward=direction == 'p'
+        )
+        await query.edit_message_text(text, reply_markup=markup)
+
+    async def build_category_page(self, category: str, user_id: int, cursor=None, backward=False):
+        """Build the text and keyboard for one page of a category."""
+        listings, has_more = await self.db.get_category_listings(
+            category,
+            limit=LISTINGS_PAGE_SIZE,
+            cursor=cursor,
+            backward=backward
+        )
+        if not listings:
+            return "📭 هیچ آگهی در این دسته‌بندی وجود ندارد.", None
+
+        # Keyset pages know only their own edges: the side we came
+        # from always has a page, the other side has one if has_more.
+        has_newer = has_more if backward else cursor is not None
+        has_older = cursor is not None if backward else has_more
+
+        bookmarked = await self.db.get_bookmark_states(
+            user_id,
+            [listing['_id'] for listing in listings]
+        )
+        cards = await self.cards.get_many(listings)
+        summaries = [
+            self.cards.summary(index, card, is_bookmarked)
+            for index, (card, is_bookmarked) in enumerate(zip(cards, bookmarked), start=1)
+        ]
+        keyboard = [[
+            InlineKeyboardButton(str(index), callback_data=f"view_{listing['_id']}")
+            for index, listing in enumerate(listings, start=1)
+        ]]
+
+        nav = []
+        if has_newer:
+            nav.append(InlineKeyboardButton(
+                "« قبلی",
+                callback_data=f"cpg:p:{category}:{encode_listing_cursor(listings[0])}"
+            ))
+        if has_older:
+            nav.append(InlineKeyboardButton(
+                "بعدی »",
+                callback_data=f"cpg:n:{category}:{encode_listing_cursor(listings[-1])}"
+            ))
+        if nav:
+            keyboard.append(nav)
+        keyboard.append([InlineKeyboardButton(
+            "🔔 خبرم کن از آگهی‌های جدید",
+            callback_data=f"ssave:c:{category}"
+        )])
+
+        return join_summaries("", summaries), InlineKeyboardMarkup(keyboard)
+
+    async def build_listing_list(self, header: str, listings: list, bookmarked: list):
+        """Build compact cards under a header, with a details button for each listing."""
+        cards = await self.cards.get_many(listings)
+        summaries = [
+            self.cards.summary(index, card, is_bookmarked)
+            for index, (card, is_bookmarked) in enumerate(zip(cards, bookmarked), start=1)
+        ]
+        buttons = [
+            InlineKeyboardButton(str(index), callback_data=f"view_{listing['_id']}")
+            for index, listing in enumerate(listings, start=1)
+        ]
+        return join_summaries(header, summaries), InlineKeyboardMarkup(
+            create_keyboard_markup(buttons, row_width=5)
+        )
+
+    async def show_user_listings(self, update: Update, context):
+        """Show the user's own listings."""
+        listings = await self.db.get_user_listings(update.effective_user.id)
+        if not listings:
+            await update.message.reply_text("📭 شما هنوز آگهی ثبت نکرده‌اید.")
+            return
+
+        bookmarked = await self.db.get_bookmark_states(
+            update.effective_user.id,
+            [listing['_id'] for listing in listings]
+        )
+        text, markup = await self.build_listing_list("📋 آگهی های من:", listings, bookmarked)
+        await update.message.reply_text(text, reply_markup=markup)
+
+    async def show_bookmarks(self, update: Update, context):
+        """Show the user's bookmarked listings."""
+        listings = await self.db.get_bookmarks(
+            update.effective_user.id,
+            limit=BOOKMARKS_LIST_LIMIT
+        )
+        if not listings:
+            await update.message.reply_text("📭 هیچ آگهی نشان نشده است.")
+            return
+
+        text, markup = await self.build_listing_list(
+            "⭐ نشان شده ها:",
+            listings,
+            [True] * len(listings)
+        )
+        await update.message.reply_text(text, reply_markup=markup)
+
+    async def start_search(self, update: Update, context):
+        """Ask the user for search keywords."""
+        await update.message.reply_text(
+            "🔍 جستجوی آگهی\n\n"
+            "عبارت مورد نظر خود را وارد کنید:",
+            reply_markup=ReplyKeyboardMarkup(
+                [["🔙 بازگشت به منوی اصلی"]],
+                resize_keyboard=True
+            )
+        )
+        return SEARCH_QUERY
+
+    async def handle_search_query(self, update: Update, context):
+        """Search listings and show the best matches."""
+        query = update.message.text
+        if query == "🔙 بازگشت به منوی اصلی":
+            await update.message.reply_text("عملیات لغو شد.")
+            return ConversationHandler.END
+
+        keywords, min_price, max_price = parse_price_range(query)
+        listings = await self.db.search_listings(
+            keywords,
+            min_price=min_price,
+            max_price=max_price
+        )
+
+        # Kept for the save button below
+        context.user_data['last_search'] = {
+            'query': keywords,
+            'min_price': min_price,
+            'max_price': max_price
+        }
+        save_button = InlineKeyboardButton("🔔 ذخیره جستجو و خبرم کن", callback_data="ssave:q")
+
         if not listings:
             await update.message.reply_text(
-                "📭 هیچ آگهی در این دسته‌بندی وجود ندارد."
+                "📭 آگهی مرتبطی پیدا نشد. عبارت دیگری را امتحان کنید:",
+                reply_markup=InlineKeyboardMarkup([[save_button]])
             )
+            return SEARCH_QUERY
+
+        bookmarked = await self.db.get_bookmark_states(
+            update.effective_user.id,
+            [listing['_id'] for listing in listings]
+        )
+        text, markup = await self.build_listing_list(
+            f"🔍 نتایج جستجو برای «{query}»:",
+            listings,
+            bookmarked
+        )
+        await update.message.reply_text(
+            text,
+            reply_markup=InlineKeyboardMarkup([*markup.inline_keyboard, [save_button]])
+        )
+        return ConversationHandler.END
+
+    async def handle_save_search(self, update: Update, context):
+        """Save the last search or a category as an alert."""
+        query = update.callback_query
+        user_id = update.effective_user.id
+
+        if query.data.startswith("ssave:c:"):
+            search_id = await self.db.add_saved_search(user_id, category=query.data[len("ssave:c:"):])
+        else:
+            last_search = context.user_data.get('last_search')
+            if not last_search:
+                await query.answer("❌ جستجویی برای ذخیره پیدا نشد.")
+                return
+            search_id = await self.db.add_saved_search(user_id, **last_search)
+
+        if search_id:
+            await query.answer("🔔 ذخیره شد. آگهی‌های جدید مطابق آن برایتان ارسال می‌شود.")
+        else:
+            await query.answer(
+                f"❌ ذخیره نشد. حداکثر {SAVED_SEARCH_LIMIT} جستجو می‌توانید ذخیره کنید.",
+                show_alert=True
+            )
+
+    async def show_saved_searches(self, update: Update, context):
+        """List the user's saved searches with delete buttons."""
+        searches = await self.db.get_saved_searches(update.effective_user.id)
+        if not searches:
+            await update.message.reply_text("📭 هیچ جستجوی ذخیره شده‌ای ندارید.")
             return
-            
-        for listing in listings:
-            await self.send_listing(update, context, listing)
 
-    async def send_listing(self, update: Update, context, listing: dict):
-        """Send a listing message."""
-        message = (
-            f"📌 {listing['title']}\n\n"
-            f"📝 {listing['description']}\n\n"
-            f"💰 قیمت: {listing['price']:,} تومان\n"
-            f"📍 موقعیت: {listing['location']}\n"
-            f"⏰ ثبت شده در: {listing['created_at'].strftime('%Y-%m-%d %H:%M')}"
+        lines = []
+        buttons = []
+        for index, search in enumerate(searches, start=1):
+            lines.append(f"{index}. {self.describe_saved_search(search)}")
+            buttons.append(InlineKeyboardButton(f"🗑 {index}", callback_data=f"sdel_{search['_id']}"))
+        await update.message.reply_text(
+            "🔔 جستجوهای ذخیره شده:\n\n" + "\n".join(lines),
+            reply_markup=InlineKeyboardMarkup(create_keyboard_markup(buttons, row_width=5))
         )
-        
+
+    def describe_saved_search(self, search: dict) -> str:
+        """Describe a saved search in one line."""
+        parts = []
+        if search.get('query'):
+            parts.append(f"«{search['query']}»")
+        if search.get('category'):
+            names = {value: name for name, value in CATEGORIES.items()}
+            parts.append(names.get(search['category'], search['category']))
+        if search.get('min_price') is not None or search.get('max_price') is not None:
+            low = f"{search['min_price']:,}" if search.get('min_price') is not None else "0"
+            high = f"{search['max_price']:,}" if search.get('max_price') is not None else "∞"
+            parts.append(f"💰 {low} تا {high}")
+        return " | ".join(parts)
+
+    async def handle_delete_saved_search(self, update: Update, context):
+        """Delete a saved search from the list."""
+        query = update.callback_query
+        deleted = await self.db.delete_saved_search(
+            update.effective_user.id,
+            query.data.split('_', 1)[1]
+        )
+        await query.answer("🗑 حذف شد." if deleted else "❌ پیدا نشد.")
+
+        # Drop the pressed button, keep the others
+        keyboard = [
+            [button for button in row if button.callback_data != query.data]
+            for row in query.message.reply_markup.inline_keyboard
+        ]
+        await query.edit_message_reply_markup(
+            InlineKeyboardMarkup([row for row in keyboard if row])
+        )
+
+    async def show_listing_details(self, update: Update, context):
+        """Send the full listing for a card selected from a page."""
+        query = update.callback_query
+        await query.answer()
+
+        listing = await self.db.get_listing(
+            query.data.split('_', 1)[1],
+            viewer_id=update.effective_user.id
+        )
+        if not listing:
+            await query.message.reply_text("❌ آگهی مورد نظر یافت نشد.")
+            return
+
+        await self.analytics.track_listing_view(
+            str(listing['_id']),
+            update.effective_user.id
+        )
+        await self.send_listing(update, context, listing)
+
+    async def handle_bookmark(self, update: Update, context):
+        """Toggle a bookmark and relabel the button that was pressed."""
+        query = update.callback_query
+        listing_id = query.data.split('_', 1)[1]
+
+        bookmarked = await self.db.toggle_bookmark(update.effective_user.id, listing_id)
+        if bookmarked is None:
+            await query.answer("❌ خطا در نشان کردن آگهی.")
+            return
+        await query.answer("⭐️ آگهی نشان شد." if bookmarked else "نشان آگهی برداشته شد.")
+
+        # Keep the rest of the keyboard as sent; urgent and full
+        # listing messages lay their buttons out differently
+        markup = query.message.reply_markup
+        if not markup:
+            return
         keyboard = [
             [
-                InlineKeyboardButton("📞 تماس", callback_data=f"contact_{listing['_id']}"),
-                InlineKeyboardButton("⭐️ نشان کردن", callback_data=f"bookmark_{listing['_id']}")
-            ],
-            [
-                InlineKeyboardButton("🚫 گزارش", callback_data=f"report_{listing['_id']}")
+                InlineKeyboardButton(BOOKMARK_LABELS[bookmarked], callback_data=button.callback_data)
+                if button.callback_data == query.data else button
+                for button in row
             ]
+            for row in markup.inline_keyboard
         ]
-        
-        if listing.get('photos'):
-            await update.message.reply_photo(
-                photo=listing['photos'][0],
-                caption=message,
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-        else:
-            await update.message.reply_text(
-                message,
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
+        await query.edit_message_reply_markup(InlineKeyboardMarkup(keyboard))
+
+    async def send_listing(self, update: Update, context, listing: dict):
+        """Send a listing message."""
+        bookmarked, = await self.db.get_bookmark_states(
+            update.effective_user.id,
+            [listing['_id']]
+        )
+        card = await self.cards.get(listing)
+        await self.cards.send(update.effective_message, card, bookmarked)
 
     def get_handler(self):
         """Return the ConversationHandler for listings."""
@@ -362,5 +632,7 @@ class ListingHandler:
             },
             fallbacks=[
                 CommandHandler('cancel', lambda u, c: ConversationHandler.END)
-            ]
+            ],
+            name="listing",
+            persistent=True
         )
@@ -10,6 +10,13 @@ from datetime import datetime
 
 REPORT_REASON = range(1)
 
+REASON_LABELS = {
+    'inappropriate': "محتوای نامناسب",
+    'scam': "کلاهبرداری",
+    'false_info': "اطلاعات نادرست",
+    'duplicate': "تکراری",
+}
+
 class ReportHandler:
     def __init__(self, db):
         self.db = db
@@ -17,16 +24,14 @@ class ReportHandler:
     async def start_report(self, update: Update, context):
         """Start the reporting process."""
         query = update.callback_query
-        listing_id = query.data.split('_')[1]
+        listing_id = query.data.split('_', 1)[1]
         context.user_data['reporting_listing'] = listing_id
         
         keyboard = [
-            [InlineKeyboardButton("محتوای نامناسب", callback_data="reason_inappropriate")],
-            [InlineKeyboardButton("کلاهبرداری", callback_data="reason_scam")],
-            [InlineKeyboardButton("اطلاعات نادرست", callback_data="reason_false_info")],
-            [InlineKeyboardButton("تکراری", callback_data="reason_duplicate")],
-            [InlineKeyboardButton("لغو ⛔️", callback_data="cancel_report")]
+            [InlineKeyboardButton(label, callback_data=f"reason_{reason}")]
+            for reason, label in REASON_LABELS.items()
         ]
+        keyboard.append([InlineKeyboardButton("لغو ⛔️", callback_data="cancel_report")])
         
         await query.edit_message_text(
             "🚫 گزارش تخلف\n\n"
@@ -42,7 +47,7 @@ class ReportHandler:
             await query.edit_message_text("❌ گزارش لغو شد.")
             return ConversationHandler.END
 
-        reason = query.data.split('_')[1]
+        reason = query.data.split('_', 1)[1]
         listing_id = context.user_data.get('reporting_listing')
         
         # Get listing details
@@ -80,7 +85,7 @@ class ReportHandler:
             entry_points=[
                 CallbackQueryHandler(
                     self.start_report,
-                    pattern=r'^report_\d+'
+                    pattern=r'^report_'
                 )
             ],
             states={
@@ -96,5 +101,7 @@ class ReportHandler:
                     lambda u, c: ConversationHandler.END,
                     pattern=r'^cancel_'
                 )
-            ]
+            ],
+            name="report",
+            persistent=True
         )
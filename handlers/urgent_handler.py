@@ -6,13 +6,14 @@ from telegram.ext import (
     ConversationHandler,
     filters,
 )
-from config import ADMIN_ID
+from config import ADMIN_ID, URGENT_LIST_LIMIT
 from datetime import datetime
 
 class UrgentListingHandler:
-    def __init__(self, db, analytics):
+    def __init__(self, db, analytics, cards):
         self.db = db
         self.analytics = analytics
+        self.cards = cards
 
     async def show_urgent_menu(self, update: Update, context):
         """Display urgent listings menu."""
@@ -31,7 +32,7 @@ class UrgentListingHandler:
 
     async def show_urgent_listings(self, update: Update, context):
         """Display all urgent listings."""
-        listings = await self.db.get_urgent_listings()
+        listings = await self.db.get_urgent_listings(limit=URGENT_LIST_LIMIT)
         
         if not listings:
             await update.message.reply_text(
@@ -45,49 +46,13 @@ class UrgentListingHandler:
             'view_urgent_listings'
         )
 
-        for listing in listings:
-            keyboard = [
-                [
-                    InlineKeyboardButton(
-                        "👁 مشاهده جزئیات",
-                        callback_data=f"view_{listing['_id']}"
-                    ),
-                    InlineKeyboardButton(
-                        "📞 تماس",
-                        callback_data=f"contact_{listing['_id']}"
-                    )
-                ],
-                [
-                    InlineKeyboardButton(
-                        "⭐️ نشان کردن",
-                        callback_data=f"bookmark_{listing['_id']}"
-                    ),
-                    InlineKeyboardButton(
-                        "🚫 گزارش",
-                        callback_data=f"report_{listing['_id']}"
-                    )
-                ]
-            ]
-            
-            message = (
-                f"🔥 آگهی فوری\n\n"
-                f"📌 {listing['title']}\n"
-                f"💰 قیمت: {listing['price']:,} تومان\n"
-                f"📍 موقعیت: {listing['location']}\n"
-                f"⏰ ثبت شده در: {listing['created_at'].strftime('%Y-%m-%d %H:%M')}"
-            )
-            
-            if listing.get('photos'):
-                await update.message.reply_photo(
-                    photo=listing['photos'][0],
-                    caption=message,
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
-            else:
-                await update.message.reply_text(
-                    message,
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
+        bookmarked = await self.db.get_bookmark_states(
+            update.effective_user.id,
+            [listing['_id'] for listing in listings]
+        )
+        cards = await self.cards.get_many(listings)
+        for card, is_bookmarked in zip(cards, bookmarked):
+            await self.cards.send(update.message, card, is_bookmarked, urgent=True)
 
     async def request_urgent_listing(self, update: Update, context):
         """Handle urgent listing request."""
@@ -135,5 +100,7 @@ class UrgentListingHandler:
                     filters.Regex("^🔙 بازگشت به منوی اصلی$"),
                     lambda u, c: ConversationHandler.END
                 )
-            ]
+            ],
+            name="urgent",
+            persistent=True
         )
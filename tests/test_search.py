@@ -0,0 +1,44 @@
+from utils.search import SearchIndex, tokenize
+
+def listing(listing_id, title, description="", **fields):
+    return {'_id': listing_id, 'title': title, 'description': description, **fields}
+
+def test_tokenize_normalizes_and_drops_stopwords():
+    assert tokenize("گوشي و می‌خواهم ۱۲") == ["گوشی", "میخواهم", "12"]
+
+def test_search_ranks_title_matches_first():
+    index = SearchIndex()
+    index.add(listing("a", "دوچرخه کوهستان", "سالم"))
+    index.add(listing("b", "میز تحریر", "همراه با دوچرخه"))
+    index.add(listing("c", "کتاب", "نو"))
+
+    results = index.search("دوچرخه")
+
+    assert [listing_id for listing_id, _ in results] == ["a", "b"]
+
+def test_search_filters_category_and_price():
+    index = SearchIndex()
+    index.add(listing("a", "گوشی سامسونگ", category="digital", price=100))
+    index.add(listing("b", "گوشی شیائومی", category="digital", price=500))
+    index.add(listing("c", "قاب گوشی", category="other", price=50))
+
+    results = index.search("گوشی", category="digital", min_price=200)
+
+    assert [listing_id for listing_id, _ in results] == ["b"]
+
+def test_search_over_listings_without_terms():
+    # Titles and descriptions of only stopwords or punctuation index to nothing
+    index = SearchIndex()
+    index.add(listing("a", "و در به", "!!!"))
+    index.add(listing("b", "...", "از که"))
+
+    assert index.search("گوشی") == []
+
+def test_removed_listings_leave_no_terms():
+    index = SearchIndex()
+    index.add(listing("a", "دوچرخه کوهستان"))
+    index.add(listing("a", "دوچرخه", status="deleted"))
+
+    assert len(index) == 0
+    assert index.postings == {}
+    assert index.search("دوچرخه") == []
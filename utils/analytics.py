@@ -1,10 +1,28 @@
+import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
+from config import (
+    ANALYTICS_QUEUE_SIZE,
+    ANALYTICS_BATCH_SIZE,
+    ANALYTICS_FLUSH_INTERVAL
+)
 
 class Analytics:
     def __init__(self, db):
         self.db = db
 
+        # Write-behind buffer of interaction events
+        self.queue = asyncio.Queue(maxsize=ANALYTICS_QUEUE_SIZE)
+        self.stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'written': 0,
+            'flushes': 0
+        }
+        self._batch = []
+        self._inflight = None
+        self._task = None
+
     async def track_interaction(
         self, 
         user_id: int, 
@@ -18,16 +36,87 @@ class Analytics:
             'timestamp': datetime.utcnow(),
             'data': data or {}
         }
-        await self.db.add_interaction(interaction)
+        self._enqueue(interaction)
 
     async def track_listing_view(self, listing_id: str, user_id: int):
         """Track listing view."""
-        view_data = {
-            'listing_id': listing_id,
-            'user_id': user_id,
-            'timestamp': datetime.utcnow()
-        }
-        await self.db.add_listing_view(view_data)
+        # One Redis round trip; counts reach Mongo via flush_view_counts
+        await self.db.track_view(listing_id, user_id)
+
+    def _enqueue(self, event: dict):
+        """Buffer an event, dropping it if the writer cannot keep up."""
+        try:
+            self.queue.put_nowait(event)
+            self.stats['enqueued'] += 1
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    @property
+    def backpressure(self) -> float:
+        """Fraction of the buffer in use, from 0 to 1."""
+        return self.queue.qsize() / self.queue.maxsize
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush task and write everything still buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._inflight:
+            await self._inflight
+
+        while not self.queue.empty():
+            self._batch.append(self.queue.get_nowait())
+        while self._batch:
+            batch = self._batch[:ANALYTICS_BATCH_SIZE]
+            self._batch = self._batch[ANALYTICS_BATCH_SIZE:]
+            await self._write(batch)
+
+    async def _flush_loop(self):
+        """Flush when a batch fills up or the flush interval passes."""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self.queue.get())
+            deadline = loop.time() + ANALYTICS_FLUSH_INTERVAL
+
+            while len(self._batch) < ANALYTICS_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(
+                        await asyncio.wait_for(self.queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self._batch = self._batch, []
+            # Shielded so stop() can wait for a write instead of cutting it
+            self._inflight = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _write(self, batch: List[dict]):
+        """Write one batch with a single insert."""
+        self.stats['written'] += await self.db.add_interactions(batch)
+        self.stats['flushes'] += 1
+
+    def get_pipeline_stats(self) -> dict:
+        """Get counters of the write-behind pipeline."""
+        return dict(
+            self.stats,
+            queued=self.queue.qsize(),
+            backpressure=round(self.backpressure, 3)
+        )
 
     async def get_user_stats(self, user_id: int) -> dict:
         """Get statistics for a specific user."""
@@ -0,0 +1,77 @@
+from typing import List, Optional
+
+# Members of a loaded set always include this placeholder, so a user
+# with no bookmarks is told apart from one whose set is not cached
+LOADED = ""
+
+# Apply a toggle only to sets that are loaded; a partial set would
+# otherwise be mistaken for the full one. Every toggle also bumps the
+# user's generation, so a load built from an older Mongo read is
+# dropped. KEYS: set, generation; ARGV: listing, state, ttl
+APPLY_SCRIPT = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    if ARGV[2] == '1' then
+        redis.call('SADD', KEYS[1], ARGV[1])
+    else
+        redis.call('SREM', KEYS[1], ARGV[1])
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return 0
+"""
+
+# Create a set from a Mongo read unless it exists already or a toggle
+# ran since the read began. KEYS: set, generation;
+# ARGV: ttl, generation seen before the read, members
+LOAD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[2] then
+    return 0
+end
+for i = 3, #ARGV, 1000 do
+    redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+class BookmarkCache:
+    def __init__(self, redis, ttl: int):
+        self.redis = redis
+        self.ttl = ttl
+        self._apply = redis.register_script(APPLY_SCRIPT)
+        self._load = redis.register_script(LOAD_SCRIPT)
+
+    async def generation(self, user_id: int) -> str:
+        """Get the user's toggle generation; read it before reading Mongo."""
+        return await self.redis.get(f"bookmarks:gen:{user_id}") or ""
+
+    async def load(self, user_id: int, listing_ids: List[str], generation: str) -> bool:
+        """Cache a user's bookmarked listing IDs unless they changed meanwhile."""
+        loaded = await self._load(
+            keys=[f"bookmarks:{user_id}", f"bookmarks:gen:{user_id}"],
+            args=[self.ttl, generation, LOADED, *listing_ids]
+        )
+        return bool(loaded)
+
+    async def apply(self, user_id: int, listing_id: str, bookmarked: bool):
+        """Mirror one toggle into the user's set if it is cached."""
+        await self._apply(
+            keys=[f"bookmarks:{user_id}", f"bookmarks:gen:{user_id}"],
+            args=[listing_id, 1 if bookmarked else 0, self.ttl]
+        )
+
+    async def contains(self, user_id: int, listing_ids: List[str]) -> Optional[List[bool]]:
+        """Check listings against the user's set; None if it is not cached."""
+        key = f"bookmarks:{user_id}"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.exists(key)
+        pipe.execute_command("SMISMEMBER", key, *listing_ids)
+        loaded, members = await pipe.execute()
+        if not loaded:
+            return None
+        return [bool(member) for member in members]
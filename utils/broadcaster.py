@@ -1,99 +1,181 @@
-from telegram.error import TelegramError
+from telegram.error import TelegramError, RetryAfter, Forbidden
 import asyncio
-from typing import Dict, List
+import time
+from collections import deque
+from typing import Dict, Optional
 from datetime import datetime
+from config import (
+    BROADCAST_RATE_LIMIT,
+    BROADCAST_CONCURRENCY,
+    BROADCAST_CHECKPOINT_INTERVAL
+)
+from utils.rate_limiter import TokenBucket
 
 class Broadcaster:
-    def __init__(self, bot, db):
-        self.bot = bot
+    def __init__(self, db):
         self.db = db
+        # One bucket for every job, since Telegram's limit is per bot
+        self.bucket = TokenBucket(BROADCAST_RATE_LIMIT)
+        self.jobs = {}
 
-    async def broadcast_message(
-        self, 
-        message: str, 
-        user_filter: Dict = None,
+    async def start_broadcast(
+        self,
+        bot,
+        admin_chat_id: int,
+        text: str = None,
+        photo=None,
         parse_mode: str = None
-    ) -> Dict[str, int]:
-        """Broadcast message to users."""
-        results = {
-            'success': 0,
-            'failed': 0,
-            'blocked': 0
+    ):
+        """Create a broadcast job and run it in the background."""
+        progress = await bot.send_message(
+            chat_id=admin_chat_id,
+            text="⏳ ارسال پیام همگانی آغاز شد..."
+        )
+
+        job = {
+            'text': text,
+            'photo': photo,
+            'parse_mode': parse_mode,
+            'admin_chat_id': admin_chat_id,
+            'progress_message_id': progress.message_id
         }
+        job['_id'] = await self.db.create_broadcast(job)
+        if job['_id'] is None:
+            await progress.edit_text("❌ خطا در ایجاد پیام همگانی.")
+            return None
 
-        users = await self.db.get_users(user_filter)
-        
-        for user in users:
-            try:
-                await self.bot.send_message(
-                    chat_id=user['user_id'],
-                    text=message,
-                    parse_mode=parse_mode
-                )
-                results['success'] += 1
-                await asyncio.sleep(0.05)  # Rate limiting
-            except TelegramError as e:
-                if 'bot was blocked' in str(e):
-                    results['blocked'] += 1
-                    await self.db.update_user_status(
-                        user['user_id'],
-                        {'blocked': True}
-                    )
-                else:
-                    results['failed'] += 1
+        self._launch(bot, job)
+        return job['_id']
 
-        return results
+    async def resume_broadcasts(self, bot):
+        """Continue jobs interrupted by a restart from their checkpoint."""
+        for job in await self.db.get_running_broadcasts():
+            self._launch(bot, job)
 
-    async def broadcast_photo(
-        self, 
-        photo, 
-        caption: str = None,
-        user_filter: Dict = None
-    ) -> Dict[str, int]:
-        """Broadcast photo with optional caption to users."""
+    def _launch(self, bot, job: dict):
+        """Run a job as a task, keeping a reference until it finishes."""
+        task = asyncio.create_task(self._run_job(bot, job))
+        self.jobs[job['_id']] = task
+        task.add_done_callback(lambda _: self.jobs.pop(job['_id'], None))
+
+    async def _run_job(self, bot, job: dict):
+        """Send a job to every remaining recipient."""
         results = {
-            'success': 0,
-            'failed': 0,
-            'blocked': 0
+            'success': job.get('success', 0),
+            'failed': job.get('failed', 0),
+            'blocked': job.get('blocked', 0)
         }
+        last_user_id = job.get('last_user_id')
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        # Sends finish out of order; only the finished prefix of this
+        # window may be checkpointed, so a resume never skips anyone.
+        window = deque()
+        checkpoint_at = time.monotonic() + BROADCAST_CHECKPOINT_INTERVAL
 
-        users = await self.db.get_users(user_filter)
-        
-        for user in users:
-            try:
-                await self.bot.send_photo(
-                    chat_id=user['user_id'],
-                    photo=photo,
-                    caption=caption
-                )
-                results['success'] += 1
-                await asyncio.sleep(0.05)  # Rate limiting
-            except TelegramError as e:
-                if 'bot was blocked' in str(e):
-                    results['blocked'] += 1
-                    await self.db.update_user_status(
-                        user['user_id'],
-                        {'blocked': True}
-                    )
-                else:
-                    results['failed'] += 1
+        async for user in self.db.iter_broadcast_recipients(last_user_id):
+            await semaphore.acquire()
+            task = asyncio.create_task(
+                self._send(bot, user['user_id'], job, semaphore)
+            )
+            window.append((user['user_id'], task))
+
+            last_user_id = self._drain(window, results, last_user_id)
+            if time.monotonic() >= checkpoint_at:
+                await self._checkpoint(bot, job, results, last_user_id)
+                checkpoint_at = time.monotonic() + BROADCAST_CHECKPOINT_INTERVAL
 
+        if window:
+            await asyncio.gather(*(task for _, task in window))
+        last_user_id = self._drain(window, results, last_user_id)
+        await self._checkpoint(bot, job, results, last_user_id, finished=True)
         return results
 
+    def _drain(self, window: deque, results: Dict[str, int], last_user_id):
+        """Count finished sends at the head of the window."""
+        while window and window[0][1].done():
+            last_user_id, task = window.popleft()
+            results[task.result()] += 1
+        return last_user_id
+
+    async def _send(self, bot, user_id: int, job: dict, semaphore) -> str:
+        """Send one message, waiting out flood limits."""
+        try:
+            while True:
+                await self.bucket.acquire()
+                try:
+                    if job.get('photo'):
+                        await bot.send_photo(
+                            chat_id=user_id,
+                            photo=job['photo'],
+                            caption=job.get('text'),
+                            parse_mode=job.get('parse_mode')
+                        )
+                    else:
+                        await bot.send_message(
+                            chat_id=user_id,
+                            text=job['text'],
+                            parse_mode=job.get('parse_mode')
+                        )
+                    return 'success'
+                except RetryAfter as e:
+                    retry_after = e.retry_after
+                    if hasattr(retry_after, 'total_seconds'):
+                        retry_after = retry_after.total_seconds()
+                    self.bucket.pause(retry_after)
+                except Forbidden:
+                    await self.db.mark_user_blocked(user_id)
+                    return 'blocked'
+                except TelegramError:
+                    return 'failed'
+        finally:
+            semaphore.release()
+
+    async def _checkpoint(
+        self,
+        bot,
+        job: dict,
+        results: Dict[str, int],
+        last_user_id,
+        finished: bool = False
+    ):
+        """Save progress and show it to the admin."""
+        update_data = dict(results, last_user_id=last_user_id)
+        if finished:
+            update_data['status'] = 'done'
+            update_data['finished_at'] = datetime.utcnow()
+        await self.db.update_broadcast(job['_id'], update_data)
+
+        header = "✅ ارسال پیام همگانی تمام شد!" if finished else "⏳ در حال ارسال پیام همگانی..."
+        try:
+            await bot.edit_message_text(
+                chat_id=job['admin_chat_id'],
+                message_id=job['progress_message_id'],
+                text=(
+                    f"{header}\n\n"
+                    f"📊 نتیجه ارسال:\n"
+                    f"✅ موفق: {results['success']}\n"
+                    f"❌ ناموفق: {results['failed']}\n"
+                    f"🚫 مسدود کرده: {results['blocked']}"
+                )
+            )
+        except TelegramError:
+            # Unchanged text or a deleted progress message
+            pass
+
     async def notify_admins(
-        self, 
+        self,
+        bot,
+        admin_ids: list,
         message: str,
-        parse_mode: str = None
+        parse_mode: Optional[str] = None
     ):
         """Send notification to admin users."""
-        admins = await self.db.get_admin_users()
-        
-        for admin in admins:
+        for admin_id in admin_ids:
             try:
-                await self.bot.send_message(
-                    chat_id=admin['user_id'],
+                await bot.send_message(
+                    chat_id=admin_id,
                     text=message,
                     parse_mode=parse_mode
                 )
             except TelegramError as e:
-                print(f"Error notifying admin {admin['user_id']}: {e}")
+                print(f"Error notifying admin {admin_id}: {e}")
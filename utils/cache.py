@@ -1,29 +1,178 @@
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+import asyncio
 import aioredis
-import json
+import time
+import uuid
 from datetime import datetime, timedelta
 import pickle
+from config import (
+    CACHE_L1_MAX_SIZE,
+    CACHE_L1_TTL,
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_CODEC,
+    CACHE_COMPRESSION,
+    CACHE_COMPRESS_THRESHOLD
+)
+from utils.codec import get_codec
+
+class LRUCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a live entry and mark it recently used."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return value
+
+    def set(self, key: str, value: Any, expire: Optional[float] = None):
+        """Store an entry, evicting the least recently used one if full."""
+        ttl = min(self.ttl, expire) if expire else self.ttl
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def delete(self, key: str):
+        """Drop an entry if present."""
+        self.entries.pop(key, None)
+
+    def clear(self):
+        """Drop all entries."""
+        self.entries.clear()
 
 class Cache:
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
+    def __init__(self, redis_url: str = "redis://localhost:6379", codec=None):
         self.redis = aioredis.from_url(
             redis_url,
             encoding="utf-8",
             decode_responses=True
         )
-        # Separate connection for binary data (images)
+        # Separate connection for binary data (images, encoded values)
         self.binary_redis = aioredis.from_url(
             redis_url,
             encoding=None,
             decode_responses=False
         )
+        self.codec = codec or get_codec(
+            CACHE_CODEC,
+            CACHE_COMPRESSION,
+            CACHE_COMPRESS_THRESHOLD
+        )
+
+        # In-process L1 holding raw Redis payloads, so callers never
+        # share (and mutate) one decoded object
+        self.local = LRUCache(CACHE_L1_MAX_SIZE, CACHE_L1_TTL)
+        # L1 is only trusted while subscribed to invalidations
+        self.local_enabled = False
+        # Bumped per invalidation; a Redis read that raced one is not kept in L1
+        self.invalidations = 0
+        self._listener = None
+        # Tags this instance's invalidation messages, so it skips its own
+        self.instance_id = uuid.uuid4().hex
+
+    async def ping(self):
+        """Check that Redis is reachable; raises if it is not."""
+        await self.redis.ping()
+
+    async def start(self):
+        """Start listening for invalidations from other instances."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen_invalidations())
+
+    async def stop(self):
+        """Stop the invalidation listener."""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self.local_enabled = False
+
+    def _invalidation(self, key: str) -> str:
+        """Build the message telling other instances a key changed."""
+        return f"{self.instance_id} {key}"
+
+    async def _listen_invalidations(self):
+        """Drop L1 entries changed or deleted on other instances."""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                self.local_enabled = True
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    sender, _, key = message['data'].partition(' ')
+                    if not key:
+                        # Untagged, from an instance still on the old format
+                        sender, key = None, sender
+                    # Our own writes already updated L1
+                    if sender != self.instance_id:
+                        self.invalidations += 1
+                        self.local.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Cache invalidation listener error: {e}")
+            finally:
+                # Invalidations may have been missed while disconnected
+                self.local_enabled = False
+                self.local.clear()
+                await pubsub.close()
+            await asyncio.sleep(1)
+
+    def get_stats(self) -> dict:
+        """Get L1 hit, miss and eviction counters."""
+        return dict(
+            self.local.stats,
+            size=len(self.local.entries),
+            enabled=self.local_enabled
+        )
+
+    async def _get_raw(self, key: str) -> Optional[bytes]:
+        """Get a raw payload from L1, falling back to Redis."""
+        if self.local_enabled:
+            data = self.local.get(key)
+            if data is not None:
+                return data
+
+        invalidations = self.invalidations
+        data = await self.binary_redis.get(key)
+        if data and self.local_enabled and invalidations == self.invalidations:
+            self.local.set(key, data)
+        return data
 
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache."""
         try:
-            data = await self.redis.get(key)
+            data = await self._get_raw(key)
             if data:
-                return json.loads(data)
+                return self.codec.decode(data)
             return None
         except Exception as e:
             print(f"Cache get error: {e}")
@@ -37,22 +186,93 @@ class Cache:
     ) -> bool:
         """Set value in cache with expiration in seconds."""
         try:
-            data = json.dumps(value)
-            await self.redis.set(key, data, ex=expire)
+            data = self.codec.encode(value)
+            pipe = self.binary_redis.pipeline(transaction=False)
+            pipe.set(key, data, ex=expire)
+            pipe.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation(key))
+            # A read of the old value in flight must not overwrite L1
+            self.invalidations += 1
+            await pipe.execute()
+            if self.local_enabled:
+                self.local.set(key, data, expire)
             return True
         except Exception as e:
             print(f"Cache set error: {e}")
             return False
 
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values with one MGET, in the order of keys."""
+        try:
+            values = [
+                self.local.get(key) if self.local_enabled else None
+                for key in keys
+            ]
+            misses = [i for i, data in enumerate(values) if data is None]
+            if misses:
+                invalidations = self.invalidations
+                fetched = await self.binary_redis.mget([keys[i] for i in misses])
+                keep = self.local_enabled and invalidations == self.invalidations
+                for i, data in zip(misses, fetched):
+                    values[i] = data
+                    if data and keep:
+                        self.local.set(keys[i], data)
+            return [self.codec.decode(data) if data else None for data in values]
+        except Exception as e:
+            print(f"Cache get_many error: {e}")
+            return [None] * len(keys)
+
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        expire: int = 3600
+    ) -> bool:
+        """Set several values in one pipeline with expiration in seconds."""
+        try:
+            pipe = self.binary_redis.pipeline(transaction=False)
+            payloads = {key: self.codec.encode(value) for key, value in mapping.items()}
+            for key, data in payloads.items():
+                pipe.set(key, data, ex=expire)
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation(key))
+            self.invalidations += 1
+            await pipe.execute()
+            if self.local_enabled:
+                for key, data in payloads.items():
+                    self.local.set(key, data, expire)
+            return True
+        except Exception as e:
+            print(f"Cache set_many error: {e}")
+            return False
+
     async def delete(self, key: str) -> bool:
-        """Delete value from cache."""
+        """Delete value from cache on every instance."""
         try:
-            await self.redis.delete(key)
+            self.local.delete(key)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(key)
+            pipe.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation(key))
+            await pipe.execute()
             return True
         except Exception as e:
             print(f"Cache delete error: {e}")
             return False
 
+    async def delete_many(self, keys: List[str]) -> bool:
+        """Delete several values on every instance in one pipeline."""
+        if not keys:
+            return True
+        try:
+            for key in keys:
+                self.local.delete(key)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(*keys)
+            for key in keys:
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, self._invalidation(key))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache delete_many error: {e}")
+            return False
+
     async def get_binary(self, key: str) -> Optional[bytes]:
         """Get binary data (images) from cache."""
         try:
@@ -0,0 +1,116 @@
+import pickle
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+import msgpack
+from bson import ObjectId, json_util
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = EPOCH.replace(tzinfo=timezone.utc)
+
+# msgpack extension type codes
+EXT_DATETIME = 1
+EXT_DATETIME_UTC = 2
+EXT_OBJECT_ID = 3
+
+# First byte of every compressed-codec payload
+RAW, ZLIB, LZ4 = b'\x00', b'\x01', b'\x02'
+
+class JsonCodec:
+    def encode(self, value: Any) -> bytes:
+        """Encode value as extended JSON."""
+        return json_util.dumps(value).encode('utf-8')
+
+    def decode(self, data: bytes) -> Any:
+        """Decode extended JSON."""
+        return json_util.loads(data)
+
+class MsgpackCodec:
+    def _default(self, value):
+        """Pack BSON values msgpack does not know as extension types."""
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                micros = (value - EPOCH) // timedelta(microseconds=1)
+                return msgpack.ExtType(EXT_DATETIME, struct.pack('>q', micros))
+            micros = (value - EPOCH_UTC) // timedelta(microseconds=1)
+            return msgpack.ExtType(EXT_DATETIME_UTC, struct.pack('>q', micros))
+        if isinstance(value, ObjectId):
+            return msgpack.ExtType(EXT_OBJECT_ID, value.binary)
+        raise TypeError(f"Cannot encode {type(value).__name__}")
+
+    def _ext_hook(self, code: int, data: bytes):
+        """Unpack extension types back to BSON values."""
+        if code == EXT_DATETIME:
+            return EPOCH + timedelta(microseconds=struct.unpack('>q', data)[0])
+        if code == EXT_DATETIME_UTC:
+            return EPOCH_UTC + timedelta(microseconds=struct.unpack('>q', data)[0])
+        if code == EXT_OBJECT_ID:
+            return ObjectId(data)
+        return msgpack.ExtType(code, data)
+
+    def encode(self, value: Any) -> bytes:
+        """Encode value as msgpack."""
+        return msgpack.packb(value, default=self._default, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        """Decode msgpack."""
+        return msgpack.unpackb(data, ext_hook=self._ext_hook, raw=False)
+
+class PickleCodec:
+    """Round-trips any picklable value, tuples and non-str keys included.
+
+    Only for data this bot wrote itself: unpickling runs code.
+    """
+
+    def encode(self, value: Any) -> bytes:
+        """Encode value with pickle."""
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data: bytes) -> Any:
+        """Decode pickle."""
+        return pickle.loads(data)
+
+class CompressedCodec:
+    def __init__(self, codec, compression: str = 'zlib', threshold: int = 1024):
+        if compression == 'lz4' and lz4 is None:
+            compression = 'zlib'
+        self.codec = codec
+        self.compression = compression
+        self.threshold = threshold
+
+    def encode(self, value: Any) -> bytes:
+        """Encode value, compressing it above the threshold."""
+        data = self.codec.encode(value)
+        if len(data) < self.threshold:
+            return RAW + data
+        if self.compression == 'lz4':
+            return LZ4 + lz4.frame.compress(data)
+        return ZLIB + zlib.compress(data)
+
+    def decode(self, data: bytes) -> Any:
+        """Decompress if flagged, then decode."""
+        flag, payload = data[:1], data[1:]
+        if flag == ZLIB:
+            payload = zlib.decompress(payload)
+        elif flag == LZ4:
+            payload = lz4.frame.decompress(payload)
+        return self.codec.decode(payload)
+
+CODECS = {
+    'json': JsonCodec,
+    'msgpack': MsgpackCodec,
+    'pickle': PickleCodec
+}
+
+def get_codec(name: str = 'msgpack', compression: Optional[str] = None, threshold: int = 1024):
+    """Build a codec by name, optionally compressing large payloads."""
+    codec = CODECS[name]()
+    if compression:
+        return CompressedCodec(codec, compression, threshold)
+    return codec
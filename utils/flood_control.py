@@ -0,0 +1,155 @@
+import time
+from typing import Dict, List, Tuple
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop
+from config import ADMIN_ID, CATEGORIES
+from utils.cache import LRUCache
+from utils.rate_limiter import TokenBucket
+
+# Take one token from every bucket, or from none if any is empty.
+# Time comes from Redis, so instances with skewed clocks share one
+# refill timeline. KEYS: buckets; ARGV: rate and burst for each bucket
+TAKE_SCRIPT = """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local burst = tonumber(ARGV[i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated_at')
+    local available = tonumber(bucket[1]) or burst
+    local updated_at = tonumber(bucket[2]) or now
+    available = math.min(burst, available + math.max(0, now - updated_at) * rate)
+    if available < 1 then
+        return 0
+    end
+    tokens[i] = available
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local burst = tonumber(ARGV[i * 2])
+    redis.call('HMSET', key, 'tokens', tokens[i] - 1, 'updated_at', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return 1
+"""
+
+MESSAGE_ACTIONS = {
+    "📢 آگهی ها": 'browse',
+    "🔍 جستجو": 'search',
+    **{category: 'browse' for category in CATEGORIES}
+}
+
+CALLBACK_ACTIONS = {
+    "cpg:": 'browse',
+    "view_": 'view',
+    "bookmark_": 'bookmark',
+    # A report takes two taps; only the reason, which writes it, is
+    # charged, so the flow costs one token and is not cut off midway
+    "reason_": 'report',
+}
+
+def classify_update(update: Update) -> str:
+    """Name the action an update asks for, to pick its bucket."""
+    if update.callback_query:
+        data = update.callback_query.data or ""
+        for prefix, action in CALLBACK_ACTIONS.items():
+            if data.startswith(prefix):
+                return action
+        return 'callback'
+    if update.inline_query:
+        return 'inline'
+    if update.message and update.message.text in MESSAGE_ACTIONS:
+        return MESSAGE_ACTIONS[update.message.text]
+    return 'message'
+
+class FloodControl:
+    def __init__(
+        self,
+        redis,
+        limits: Dict[str, Tuple[float, float]],
+        warning_cooldown: float,
+        redis_retry_after: float
+    ):
+        self.redis = redis
+        self.limits = limits
+        self.warning_cooldown = warning_cooldown
+        self.redis_retry_after = redis_retry_after
+        self._take = redis.register_script(TAKE_SCRIPT)
+
+        # In-process buckets used while Redis is unreachable
+        self.local_buckets = LRUCache(max_size=10000, ttl=600)
+        self.warned = LRUCache(max_size=10000, ttl=warning_cooldown)
+        self.redis_down_until = 0.0
+        self.stats = {'allowed': 0, 'blocked': 0, 'fallbacks': 0}
+
+    def _buckets(self, user_id: int, action: str) -> List[Tuple[str, Tuple[float, float]]]:
+        buckets = [(f"flood:{user_id}:any", self.limits['any'])]
+        if action in self.limits and action != 'any':
+            buckets.append((f"flood:{user_id}:{action}", self.limits[action]))
+        return buckets
+
+    async def allow(self, user_id: int, action: str) -> bool:
+        """Take a token for a user's action from Redis, or locally if it is down."""
+        buckets = self._buckets(user_id, action)
+
+        if time.monotonic() >= self.redis_down_until:
+            args = []
+            for _, (rate, burst) in buckets:
+                args.extend([rate, burst])
+            try:
+                return bool(await self._take(keys=[key for key, _ in buckets], args=args))
+            except Exception as e:
+                print(f"Flood control Redis error, using local buckets: {e}")
+                self.redis_down_until = time.monotonic() + self.redis_retry_after
+
+        self.stats['fallbacks'] += 1
+        local = []
+        for key, (rate, burst) in buckets:
+            bucket = self.local_buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(rate, burst)
+                self.local_buckets.set(key, bucket)
+            local.append(bucket)
+        # Same all-or-nothing rule as the script
+        for index, bucket in enumerate(local):
+            if not bucket.try_acquire():
+                for taken in local[:index]:
+                    taken.tokens += 1
+                return False
+        return True
+
+    async def check_update(self, update: Update, context):
+        """Group -1 handler: stop the update if the user is over their limit."""
+        user = update.effective_user
+        if not user or str(user.id) == str(ADMIN_ID):
+            return
+
+        if await self.allow(user.id, classify_update(update)):
+            self.stats['allowed'] += 1
+            return
+
+        self.stats['blocked'] += 1
+        await self._warn(update, user.id)
+        raise ApplicationHandlerStop
+
+    async def _warn(self, update: Update, user_id: int):
+        """Tell a throttled user to slow down, at most once per cooldown."""
+        message = "⏳ درخواست‌های شما زیاد است. لطفاً کمی صبر کنید."
+        try:
+            if update.callback_query:
+                # Always answer, or the button keeps spinning
+                await update.callback_query.answer(message)
+            elif update.inline_query:
+                await update.inline_query.answer([], cache_time=0)
+            elif self.warned.get(str(user_id)) is None and update.effective_message:
+                self.warned.set(str(user_id), True)
+                await update.effective_message.reply_text(message)
+        except Exception as e:
+            print(f"Error sending flood warning: {e}")
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
@@ -1,8 +1,10 @@
 import re
-from typing import Optional
-from datetime import datetime
-from PIL import Image
-import io
+from typing import Optional, Tuple
+from datetime import datetime, timedelta
+from bson import ObjectId
+from utils.images import get_image_pipeline
+
+EPOCH = datetime(1970, 1, 1)
 
 def validate_phone_number(phone: str) -> bool:
     """Validate phone number format."""
@@ -19,28 +21,27 @@ def format_datetime(dt: datetime) -> str:
     """Format datetime to Persian style string."""
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
-async def process_image(image_data: bytes, max_size: tuple = (800, 800)) -> Optional[bytes]:
-    """Process and optimize image."""
+def encode_listing_cursor(listing: dict) -> str:
+    """Encode a listing's (created_at, _id) as a compact cursor string."""
+    millis = (listing['created_at'] - EPOCH) // timedelta(milliseconds=1)
+    return f"{millis}:{listing['_id']}"
+
+def decode_listing_cursor(cursor: str) -> Optional[Tuple[datetime, ObjectId]]:
+    """Decode a cursor string created by encode_listing_cursor."""
     try:
-        # Open image
-        img = Image.open(io.BytesIO(image_data))
-        
-        # Convert to RGB if needed
-        if img.mode in ('RGBA', 'P'):
-            img = img.convert('RGB')
-        
-        # Resize if larger than max_size
-        if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-            img.thumbnail(max_size, Image.LANCZOS)
-        
-        # Save optimized image
-        output = io.BytesIO()
-        img.save(output, format='JPEG', quality=85, optimize=True)
-        return output.getvalue()
-    except Exception as e:
-        print(f"Error processing image: {e}")
+        millis, listing_id = cursor.split(':')
+        created_at = EPOCH + timedelta(milliseconds=int(millis))
+        if ObjectId.is_valid(listing_id):
+            listing_id = ObjectId(listing_id)
+        return created_at, listing_id
+    except ValueError:
         return None
 
+async def process_image(image_data: bytes, max_size: tuple = (800, 800)) -> Optional[bytes]:
+    """Process and optimize image in the image worker pool."""
+    result = await get_image_pipeline().process(image_data, {'full': max_size})
+    return result['full'] if result else None
+
 def validate_listing_data(data: dict) -> tuple[bool, str]:
     """Validate listing data."""
     if len(data.get('title', '')) < 10:
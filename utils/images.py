@@ -0,0 +1,141 @@
+import asyncio
+import io
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from PIL import Image
+from config import (
+    MAX_IMAGE_SIZE,
+    ALLOWED_IMAGE_TYPES,
+    IMAGE_VARIANTS,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_PROCESS_WORKERS,
+    IMAGE_QUEUE_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of each supported format
+SIGNATURES = {
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'\x89PNG\r\n\x1a\n': 'image/png'
+}
+
+def detect_mime_type(image_data: bytes) -> Optional[str]:
+    """Detect the image type from its leading bytes."""
+    for signature, mime_type in SIGNATURES.items():
+        if image_data.startswith(signature):
+            return mime_type
+    return None
+
+def validate_image(image_data: bytes) -> Tuple[bool, str]:
+    """Check size and type limits without decoding the image."""
+    if len(image_data) > MAX_IMAGE_SIZE:
+        return False, "حجم عکس بیش از حد مجاز است."
+    if detect_mime_type(image_data) not in ALLOWED_IMAGE_TYPES:
+        return False, "فرمت عکس پشتیبانی نمی‌شود."
+    return True, ""
+
+def render_variants(
+    image_data: bytes,
+    variants: Dict[str, Tuple[int, int]],
+    quality: int
+) -> Tuple[Dict[str, bytes], Dict[str, float]]:
+    """Decode once and encode every variant as JPEG. Runs in a worker process."""
+    started = time.perf_counter()
+    img = Image.open(io.BytesIO(image_data))
+
+    # Let the JPEG decoder downscale while decoding when the
+    # largest variant is much smaller than the source
+    largest = max(variants.values())
+    img.draft('RGB', largest)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.load()
+    decoded = time.perf_counter()
+
+    outputs = {}
+    # Largest first, so each smaller variant resizes an already smaller image
+    for name, max_size in sorted(variants.items(), key=lambda item: item[1], reverse=True):
+        if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
+            img = img.copy()
+            img.thumbnail(max_size, Image.LANCZOS)
+        output = io.BytesIO()
+        img.save(output, format='JPEG', quality=quality, optimize=True)
+        outputs[name] = output.getvalue()
+
+    timing = {
+        'decode_ms': (decoded - started) * 1000,
+        'encode_ms': (time.perf_counter() - decoded) * 1000
+    }
+    return outputs, timing
+
+class ImagePipeline:
+    def __init__(
+        self,
+        workers: int = IMAGE_PROCESS_WORKERS,
+        queue_size: int = IMAGE_QUEUE_SIZE
+    ):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        # Bounds images waiting for or inside the pool
+        self.slots = asyncio.Semaphore(queue_size)
+
+    async def process(
+        self,
+        image_data: bytes,
+        variants: Dict[str, Tuple[int, int]] = None
+    ) -> Optional[dict]:
+        """Validate an image and render its variants off the event loop.
+
+        Returns a dict with the JPEG bytes of each variant under its
+        name, or None if the image is rejected. The time spent queued,
+        decoding and encoding is logged at debug level.
+        """
+        valid, error = validate_image(image_data)
+        if not valid:
+            print(f"Image rejected: {error}")
+            return None
+
+        started = time.perf_counter()
+        async with self.slots:
+            queued = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                outputs, timing = await loop.run_in_executor(
+                    self.executor,
+                    render_variants,
+                    image_data,
+                    variants or IMAGE_VARIANTS,
+                    IMAGE_JPEG_QUALITY
+                )
+            except Exception as e:
+                print(f"Error processing image: {e}")
+                return None
+
+        timing['queue_ms'] = (queued - started) * 1000
+        timing['total_ms'] = (time.perf_counter() - started) * 1000
+        logger.debug(
+            "Image processed: " + ", ".join(f"{name} {ms:.1f}" for name, ms in timing.items())
+        )
+        return outputs
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+_pipeline = None
+
+def get_image_pipeline() -> ImagePipeline:
+    """Get the shared pipeline, starting it on first use."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ImagePipeline()
+    return _pipeline
+
+def shutdown_image_pipeline():
+    """Stop the shared pipeline if it was started."""
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.shutdown()
+        _pipeline = None
@@ -0,0 +1,145 @@
+from datetime import timedelta
+from typing import List
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+from utils.helpers import EPOCH, format_price
+
+BOOKMARK_LABELS = {True: "⭐️ نشان شده", False: "☆ نشان کردن"}
+
+# Telegram's limits on message text and photo captions, counted in
+# UTF-16 code units
+MESSAGE_LIMIT = 4096
+CAPTION_LIMIT = 1024
+# Bumped when render_card's layout changes, so cached cards are re-rendered
+CARD_FORMAT = 2
+
+def text_length(text: str) -> int:
+    """Length of a text as Telegram counts it."""
+    return len(text.encode('utf-16-le')) // 2
+
+def shorten(text: str, limit: int) -> str:
+    """Cut a text to at most limit UTF-16 units, marking the cut."""
+    if text_length(text) <= limit:
+        return text
+    while text and text_length(text) > limit - 1:
+        text = text[:-1]
+    return text + "…"
+
+def join_summaries(header: str, summaries: List[str]) -> str:
+    """Join list lines under a header, shortening them to fit one message."""
+    header = shorten(header, MESSAGE_LIMIT // 4)
+    separators = 2 * len(summaries)
+    budget = (MESSAGE_LIMIT - text_length(header) - separators) // max(1, len(summaries))
+    return "\n\n".join([header, *(shorten(line, budget) for line in summaries)]).lstrip()
+
+def listing_version(listing: dict) -> int:
+    """Millisecond timestamp of the listing's last change."""
+    changed_at = listing.get('updated_at') or listing['created_at']
+    return (changed_at - EPOCH) // timedelta(milliseconds=1)
+
+def render_card(listing: dict) -> dict:
+    """Build every text and button layout a listing is shown with.
+
+    Bookmark buttons are left without a label; it is per user and is
+    filled in when the keyboard is built.
+    """
+    listing_id = listing['_id']
+    created_at = listing['created_at'].strftime('%Y-%m-%d %H:%M')
+    photos = listing.get('photos')
+
+    def caption(description: str) -> str:
+        return (
+            f"📌 {listing['title']}\n\n"
+            f"📝 {description}\n\n"
+            f"💰 قیمت: {listing['price']:,} تومان\n"
+            f"📍 موقعیت: {listing['location']}\n"
+            f"⏰ ثبت شده در: {created_at}"
+        )
+
+    # Photo captions are capped lower than messages; only the
+    # description is cut, so price, location and date always show
+    full_caption = caption(listing['description'])
+    photo_caption = full_caption
+    if text_length(full_caption) > CAPTION_LIMIT:
+        room = CAPTION_LIMIT - text_length(caption(""))
+        photo_caption = shorten(caption(shorten(listing['description'], max(room, 1))), CAPTION_LIMIT)
+
+    return {
+        'format': CARD_FORMAT,
+        'version': listing_version(listing),
+        'photo': photos[0] if photos else None,
+        'summary': (
+            f"{listing['title']}\n"
+            f"💰 {format_price(listing['price'])} | 📍 {listing['location']}"
+        ),
+        'caption': full_caption,
+        'photo_caption': photo_caption,
+        'buttons': [
+            [["📞 تماس", f"contact_{listing_id}"], [None, f"bookmark_{listing_id}"]],
+            [["🚫 گزارش", f"report_{listing_id}"]]
+        ],
+        'urgent_caption': (
+            f"🔥 آگهی فوری\n\n"
+            f"📌 {listing['title']}\n"
+            f"💰 قیمت: {listing['price']:,} تومان\n"
+            f"📍 موقعیت: {listing['location']}\n"
+            f"⏰ ثبت شده در: {created_at}"
+        ),
+        'urgent_buttons': [
+            [["👁 مشاهده جزئیات", f"view_{listing_id}"], ["📞 تماس", f"contact_{listing_id}"]],
+            [[None, f"bookmark_{listing_id}"], ["🚫 گزارش", f"report_{listing_id}"]]
+        ]
+    }
+
+class ListingCards:
+    """Rendered listing cards, cached per listing version in L1 and Redis."""
+
+    def __init__(self, cache, ttl: int):
+        self.cache = cache
+        self.ttl = ttl
+
+    async def get_many(self, listings: List[dict]) -> List[dict]:
+        """Get the cards of listings, rendering only missing or stale ones."""
+        keys = [f"card:{listing['_id']}" for listing in listings]
+        cards = await self.cache.get_many(keys) if self.cache else [None] * len(keys)
+
+        rendered = {}
+        for index, (listing, card) in enumerate(zip(listings, cards)):
+            if (
+                card is None
+                or card.get('format') != CARD_FORMAT
+                or card['version'] != listing_version(listing)
+            ):
+                cards[index] = rendered[keys[index]] = render_card(listing)
+        if rendered and self.cache:
+            await self.cache.set_many(rendered, self.ttl)
+        return cards
+
+    async def get(self, listing: dict) -> dict:
+        """Get the card of one listing."""
+        card, = await self.get_many([listing])
+        return card
+
+    def keyboard(self, card: dict, bookmarked: bool, urgent: bool = False) -> InlineKeyboardMarkup:
+        """Build a card's keyboard with the user's bookmark state."""
+        rows = card['urgent_buttons'] if urgent else card['buttons']
+        return InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton(label or BOOKMARK_LABELS[bookmarked], callback_data=data)
+                for label, data in row
+            ]
+            for row in rows
+        ])
+
+    def summary(self, index: int, card: dict, bookmarked: bool) -> str:
+        """Format a compact numbered line for list pages."""
+        return f"{index}. {'⭐️' if bookmarked else '📌'} {card['summary']}"
+
+    async def send(self, message, card: dict, bookmarked: bool, urgent: bool = False):
+        """Reply to a message with the full card."""
+        markup = self.keyboard(card, bookmarked, urgent)
+        if card['photo']:
+            caption = card['urgent_caption'] if urgent else card['photo_caption']
+            await message.reply_photo(photo=card['photo'], caption=caption, reply_markup=markup)
+        else:
+            caption = card['urgent_caption'] if urgent else card['caption']
+            await message.reply_text(caption, reply_markup=markup)
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Dict, Optional, Set, Tuple
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+# Marks a user or chat whose data was dropped and must be deleted
+DELETED = object()
+
+class RedisPersistence(BasePersistence):
+    """Keep conversation states, user_data and chat_data in Redis.
+
+    Writes are buffered: PTB hands over every changed user, chat and
+    conversation once per update_interval, those whose encoded data
+    did not change since the last write are skipped, and the rest go
+    out in one pipeline. user_data and chat_data are loaded on a
+    user's or chat's first update rather than all at startup;
+    conversation states are loaded per handler at startup, one hash
+    holding only the conversations still in progress.
+
+    The codec must round-trip whatever handlers store, tuples and
+    non-str keys included; bot.py uses pickle, as PicklePersistence does.
+    """
+
+    def __init__(self, redis, codec, update_interval: float, ttl: int, prefix: str = "ptb"):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=update_interval
+        )
+        self.redis = redis
+        self.codec = codec
+        self.ttl = ttl
+        self.prefix = prefix
+
+        self._loaded: Dict[str, Set[int]] = {"user_data": set(), "chat_data": set()}
+        self._digests: Dict[Tuple[str, int], bytes] = {}
+        self._dirty: Dict[Tuple[str, int], object] = {}
+        self._dirty_conversations: Dict[Tuple[str, str], Optional[object]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _key(self, kind: str, id_: int) -> str:
+        """Redis key of one user's, chat's or conversation's data."""
+        return f"{self.prefix}:{kind}:{id_}"
+
+    # Loading
+
+    async def get_user_data(self) -> dict:
+        """Return no user_data up front; it is loaded per user on first use."""
+        return {}
+
+    async def get_chat_data(self) -> dict:
+        """Return no chat_data up front; it is loaded per chat on first use."""
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        """bot_data is not persisted."""
+        return {}
+
+    async def get_callback_data(self):
+        """callback_data is not persisted."""
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        """Load the in-progress states of one ConversationHandler."""
+        stored = await self.redis.hgetall(self._key("conversations", name))
+        return {
+            tuple(json.loads(key)): json.loads(state)
+            for key, state in stored.items()
+        }
+
+    async def _load(self, kind: str, id_: int, data: dict):
+        """Fill an in-memory dict from Redis on its first use."""
+        if id_ in self._loaded[kind]:
+            return
+        self._loaded[kind].add(id_)
+
+        raw = await self.redis.get(self._key(kind, id_))
+        if raw is None:
+            return
+        try:
+            stored = self.codec.decode(raw)
+        except Exception as e:
+            # Unreadable, e.g. written with another codec; start afresh
+            # rather than fail every update of this user or chat
+            logger.warning(f"Dropping unreadable {kind} of {id_}: {e}")
+            return
+        self._digests[(kind, id_)] = hashlib.blake2b(raw, digest_size=16).digest()
+        for key, value in stored.items():
+            data.setdefault(key, value)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict):
+        """Load a user's data before their first update is handled."""
+        await self._load("user_data", user_id, user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict):
+        """Load a chat's data before its first update is handled."""
+        await self._load("chat_data", chat_id, chat_data)
+
+    async def refresh_bot_data(self, bot_data: dict):
+        """bot_data is not persisted."""
+
+    # Buffered writes
+
+    async def update_user_data(self, user_id: int, data: dict):
+        """Queue a user's data for the next write."""
+        self._dirty[("user_data", user_id)] = data
+        await self._schedule_flush()
+
+    async def update_chat_data(self, chat_id: int, data: dict):
+        """Queue a chat's data for the next write."""
+        self._dirty[("chat_data", chat_id)] = data
+        await self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int):
+        """Queue the deletion of a user's data."""
+        self._dirty[("user_data", user_id)] = DELETED
+        await self._schedule_flush()
+
+    async def drop_chat_data(self, chat_id: int):
+        """Queue the deletion of a chat's data."""
+        self._dirty[("chat_data", chat_id)] = DELETED
+        await self._schedule_flush()
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]):
+        """Queue a conversation state change; None ends the conversation."""
+        self._dirty_conversations[(name, json.dumps(list(key)))] = new_state
+        await self._schedule_flush()
+
+    async def update_bot_data(self, data: dict):
+        """bot_data is not persisted."""
+
+    async def update_callback_data(self, data):
+        """callback_data is not persisted."""
+
+    async def _schedule_flush(self):
+        """Wait for the write of the queued changes, starting it unless one is pending."""
+        # PTB calls the update_* methods of one persistence run together;
+        # they all wait on the same flush, which goes out once they queued
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_soon())
+        await self._flush_task
+
+    async def _flush_soon(self):
+        """Write the queued changes once the current persistence run queued them all."""
+        await asyncio.sleep(0)
+        self._flush_task = None
+        await self._write_dirty()
+
+    async def _write_dirty(self):
+        """Write buffered changes in one pipeline."""
+        dirty, self._dirty = self._dirty, {}
+        conversations, self._dirty_conversations = self._dirty_conversations, {}
+
+        pipe = self.redis.pipeline(transaction=False)
+        digests = {}
+        for (kind, id_), data in dirty.items():
+            key = self._key(kind, id_)
+            if data is DELETED:
+                pipe.delete(key)
+                digests[(kind, id_)] = None
+                continue
+            if not data:
+                if self._digests.get((kind, id_)) is not None:
+                    pipe.delete(key)
+                    digests[(kind, id_)] = None
+                continue
+
+            raw = self.codec.encode(data)
+            digest = hashlib.blake2b(raw, digest_size=16).digest()
+            if self._digests.get((kind, id_)) == digest:
+                continue
+            pipe.set(key, raw, ex=self.ttl)
+            digests[(kind, id_)] = digest
+
+        for (name, key), state in conversations.items():
+            if state is None:
+                pipe.hdel(self._key("conversations", name), key)
+            else:
+                pipe.hset(self._key("conversations", name), key, json.dumps(state))
+
+        if not digests and not conversations:
+            return
+        try:
+            await pipe.execute()
+        except Exception:
+            # Put the batch back for the next run unless newer data came in
+            for item, data in dirty.items():
+                self._dirty.setdefault(item, data)
+            for item, state in conversations.items():
+                self._dirty_conversations.setdefault(item, state)
+            raise
+
+        for item, digest in digests.items():
+            if digest is None:
+                self._digests.pop(item, None)
+            else:
+                self._digests[item] = digest
+        logger.debug(
+            f"Persisted {len(digests)} data entries and "
+            f"{len(conversations)} conversation states"
+        )
+
+    async def flush(self):
+        """Write everything still queued; PTB calls this on shutdown."""
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._write_dirty()
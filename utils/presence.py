@@ -0,0 +1,44 @@
+import time
+from typing import Dict
+from utils.cache import LRUCache
+
+PRESENCE_KEY = "presence"
+
+class Presence:
+    """Last-seen times of users in one Redis sorted set."""
+
+    def __init__(self, redis, resolution: float, retention: int):
+        self.redis = redis
+        self.retention = retention
+        # Users seen by this instance within the last `resolution`
+        # seconds; their score is fresh enough to skip the ZADD
+        self.recent = LRUCache(max_size=100000, ttl=resolution)
+
+    async def touch(self, user_id: int):
+        """Record that a user is active now."""
+        if self.recent.get(str(user_id)) is not None:
+            return
+        self.recent.set(str(user_id), True)
+        try:
+            await self.redis.zadd(PRESENCE_KEY, {str(user_id): time.time()})
+        except Exception as e:
+            print(f"Error recording presence: {e}")
+
+    async def count_online(self, windows: Dict[str, int]) -> Dict[str, int]:
+        """Count users active within each window, in seconds, by name."""
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        for seconds in windows.values():
+            pipe.zcount(PRESENCE_KEY, now - seconds, "+inf")
+        counts = await pipe.execute()
+        return dict(zip(windows, counts))
+
+    async def trim(self) -> int:
+        """Drop users not seen within the retention period."""
+        try:
+            return await self.redis.zremrangebyscore(
+                PRESENCE_KEY, "-inf", time.time() - self.retention
+            )
+        except Exception as e:
+            print(f"Error trimming presence: {e}")
+            return 0
@@ -0,0 +1,243 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Arabic letter forms and digits mapped to their Persian/ASCII equivalents
+CHAR_MAP = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'ۀ': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # Persian digits
+    **{chr(0x0660 + i): str(i) for i in range(10)}   # Arabic digits
+})
+
+# Harakat, superscript alef and tatweel
+DIACRITICS = re.compile('[\u064B-\u065F\u0670\u0640]')
+# ZWNJ and other invisible joiners/marks: "می‌خواهم" matches "میخواهم"
+ZERO_WIDTH = re.compile('[\u200B-\u200F\u202A-\u202E\uFEFF]')
+TOKEN = re.compile(r'\w+')
+
+STOPWORDS = {
+    'و', 'در', 'به', 'از', 'که', 'با', 'این', 'ان', 'را', 'برای',
+    'یا', 'تا', 'هم', 'بر', 'یک', 'است', 'هست', 'شده', 'می'
+}
+
+TITLE_WEIGHT = 2  # title terms count as this many occurrences
+K1 = 1.2
+B = 0.75
+
+def normalize(text: str) -> str:
+    """Normalize Persian text for indexing and querying."""
+    text = text.translate(CHAR_MAP)
+    text = DIACRITICS.sub('', text)
+    text = ZERO_WIDTH.sub('', text)
+    return text.lower()
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized text into index terms."""
+    return [
+        token for token in TOKEN.findall(normalize(text))
+        if token not in STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+class SearchIndex:
+    def __init__(self, urgent_boost: float = 1.5):
+        self.urgent_boost = urgent_boost
+        # term -> {listing_id: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # listing_id -> (length, category, price, is_urgent, terms)
+        self.docs: Dict[str, tuple] = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def clear(self):
+        """Remove every listing from the index."""
+        self.postings.clear()
+        self.docs.clear()
+        self.total_length = 0
+
+    def add(self, listing: dict):
+        """Index or re-index a listing; non-active listings are removed."""
+        listing_id = str(listing['_id'])
+        self.remove(listing_id)
+        if listing.get('status', 'active') != 'active':
+            return
+
+        terms = Counter(tokenize(listing.get('description', '')))
+        for term in tokenize(listing.get('title', '')):
+            terms[term] += TITLE_WEIGHT
+
+        length = sum(terms.values())
+        self.docs[listing_id] = (
+            length,
+            listing.get('category'),
+            listing.get('price', 0),
+            bool(listing.get('is_urgent')),
+            tuple(terms)
+        )
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[listing_id] = frequency
+
+    def remove(self, listing_id: str):
+        """Remove a listing from the index if present."""
+        doc = self.docs.pop(str(listing_id), None)
+        if not doc:
+            return
+
+        self.total_length -= doc[0]
+        for term in doc[4]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(str(listing_id), None)
+                if not postings:
+                    del self.postings[term]
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        limit: int = 10
+    ) -> List[Tuple[str, float]]:
+        """Return the top listing IDs and BM25 scores for a query."""
+        terms = set(tokenize(query))
+        # With no indexed terms at all nothing can match, and the average
+        # document length below would be zero
+        if not terms or not self.total_length:
+            return []
+
+        total = len(self.docs)
+        docs = self.docs
+        # Per-document length normalization, shared by every term
+        length_norm = K1 * B / (self.total_length / total)
+        base_norm = K1 * (1 - B)
+        scores: Dict[str, float] = {}
+
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            weight = idf * (K1 + 1)
+            for listing_id, frequency in postings.items():
+                norm = base_norm + length_norm * docs[listing_id][0]
+                scores[listing_id] = scores.get(listing_id, 0.0) + (
+                    weight * frequency / (frequency + norm)
+                )
+
+        def matches(item):
+            _, doc_category, price, _, _ = self.docs[item[0]]
+            return (
+                (category is None or doc_category == category)
+                and (min_price is None or price >= min_price)
+                and (max_price is None or price <= max_price)
+            )
+
+        def boosted(item):
+            listing_id, score = item
+            if self.docs[listing_id][3]:
+                return listing_id, score * self.urgent_boost
+            return item
+
+        return heapq.nlargest(
+            limit,
+            map(boosted, filter(matches, scores.items())),
+            key=lambda item: item[1]
+        )
+
+# "قیمت 100000-500000", either bound may be left out
+PRICE_RANGE = re.compile(r'قیمت\s*(\d[\d,]*)?\s*-\s*(\d[\d,]*)?')
+
+def parse_price_range(text: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """Split a price range off a search query."""
+    text = normalize(text)
+    match = PRICE_RANGE.search(text)
+    if not match:
+        return text, None, None
+
+    low, high = (int(bound.replace(',', '')) if bound else None for bound in match.groups())
+    return (text[:match.start()] + text[match.end():]).strip(), low, high
+
+class SavedSearchIndex:
+    """Match new listings against saved searches without scanning them.
+
+    A saved search matches a listing in its category (any category if
+    it has none) whose price is in range and whose title and
+    description contain all of its keywords. Each search is filed
+    under one (category, keyword) key, so a listing only checks the
+    searches filed under its own terms.
+    """
+
+    def __init__(self):
+        # (category, anchor keyword) -> {search_id: search}
+        self.predicates: Dict[Tuple[Optional[str], Optional[str]], Dict[str, dict]] = {}
+        self.keys: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        """Remove every saved search from the index."""
+        self.predicates.clear()
+        self.keys.clear()
+
+    def add(self, search: dict):
+        """Index or re-index a saved search."""
+        search_id = str(search['_id'])
+        self.remove(search_id)
+
+        keywords = search.get('keywords') or []
+        # Longer words are rarer, so fewer listings reach the full check
+        anchor = max(keywords, key=len) if keywords else None
+        key = (search.get('category'), anchor)
+        self.keys[search_id] = key
+        self.predicates.setdefault(key, {})[search_id] = {
+            'user_id': search['user_id'],
+            'keywords': frozenset(keywords),
+            'min_price': search.get('min_price'),
+            'max_price': search.get('max_price')
+        }
+
+    def remove(self, search_id: str):
+        """Remove a saved search from the index if present."""
+        key = self.keys.pop(str(search_id), None)
+        if key is None:
+            return
+
+        searches = self.predicates[key]
+        searches.pop(str(search_id), None)
+        if not searches:
+            del self.predicates[key]
+
+    def match(self, listing: dict) -> List[Tuple[str, int]]:
+        """Return (search_id, user_id) of every saved search the listing matches."""
+        terms = set(tokenize(listing.get('title', '')))
+        terms.update(tokenize(listing.get('description', '')))
+        price = listing.get('price', 0)
+
+        matched = []
+        for category in {listing.get('category'), None}:
+            for anchor in (None, *terms):
+                for search_id, search in self.predicates.get((category, anchor), {}).items():
+                    if (
+                        search['keywords'] <= terms
+                        and (search['min_price'] is None or price >= search['min_price'])
+                        and (search['max_price'] is None or price <= search['max_price'])
+                    ):
+                        matched.append((search_id, search['user_id']))
+        return matched
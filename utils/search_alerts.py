@@ -0,0 +1,72 @@
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.error import TelegramError, RetryAfter, Forbidden
+import asyncio
+from config import ALERT_BATCH_SIZE, ALERT_MAX_LISTINGS
+
+class SearchAlerts:
+    def __init__(self, db, cards, bucket):
+        self.db = db
+        self.cards = cards
+        # The broadcaster's bucket: Telegram's limit is per bot, not per job
+        self.bucket = bucket
+        self._lock = asyncio.Lock()
+
+    async def send_pending(self, bot) -> int:
+        """Send queued saved-search alerts, one message per user."""
+        # A slow run must not overlap the next one and double-send
+        if self._lock.locked():
+            return 0
+        async with self._lock:
+            alerts = await self.db.pop_search_alerts(ALERT_BATCH_SIZE)
+            if not alerts:
+                return 0
+
+            listing_ids = {
+                listing_id
+                for user_listing_ids in alerts.values()
+                for listing_id in user_listing_ids[:ALERT_MAX_LISTINGS]
+            }
+            listings = await self.db.get_listings(list(listing_ids))
+            cards = dict(zip(
+                (str(listing['_id']) for listing in listings),
+                await self.cards.get_many(listings)
+            ))
+
+            sent = 0
+            for user_id, user_listing_ids in alerts.items():
+                found = [listing_id for listing_id in user_listing_ids if listing_id in cards]
+                if found and await self._send(bot, user_id, found, cards):
+                    sent += 1
+            return sent
+
+    async def _send(self, bot, user_id: int, listing_ids: list, cards: dict) -> bool:
+        """Send one user's alert, waiting out flood limits."""
+        shown = listing_ids[:ALERT_MAX_LISTINGS]
+        summaries = [
+            self.cards.summary(index, cards[listing_id], False)
+            for index, listing_id in enumerate(shown, start=1)
+        ]
+        text = "🔔 آگهی جدید مطابق جستجوهای ذخیره شده شما:\n\n" + "\n\n".join(summaries)
+        if len(listing_ids) > len(shown):
+            text += f"\n\n➕ و {len(listing_ids) - len(shown)} آگهی دیگر"
+        markup = InlineKeyboardMarkup([[
+            InlineKeyboardButton(str(index), callback_data=f"view_{listing_id}")
+            for index, listing_id in enumerate(shown, start=1)
+        ]])
+
+        while True:
+            await self.bucket.acquire()
+            try:
+                await bot.send_message(chat_id=user_id, text=text, reply_markup=markup)
+                return True
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if hasattr(retry_after, 'total_seconds'):
+                    retry_after = retry_after.total_seconds()
+                self.bucket.pause(retry_after)
+            except Forbidden:
+                await self.db.mark_user_blocked(user_id)
+                return False
+            except TelegramError as e:
+                print(f"Error sending search alert to {user_id}: {e}")
+                return False
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # (chat_id, user_id) -> [lock, number of updates holding or waiting]
+        self.locks = {}
+
+    def _key(self, update: object) -> Optional[tuple]:
+        """Key updates the same way ConversationHandler keys its state."""
+        if not isinstance(update, Update):
+            return None
+        chat = update.effective_chat
+        user = update.effective_user
+        if chat is None and user is None:
+            return None
+        return (chat.id if chat else None, user.id if user else None)
+
+    async def process_update(self, update: object, coroutine: Awaitable):  # type: ignore[misc]
+        """Run updates of different users concurrently, one user's in order.
+
+        An update waits for its user's earlier updates before it takes a
+        concurrency slot. The base class takes the slot first, so a user
+        tapping fast would fill every slot with updates queued behind
+        each other and stall all other users.
+        """
+        key = self._key(update)
+        if key is None:
+            async with self._semaphore:
+                await self.do_process_update(update, coroutine)
+            return
+
+        entry = self.locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._semaphore:
+                    await self.do_process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.locks[key]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable):
+        """Handle one update; ordering and limits are applied in process_update."""
+        await coroutine
+
+    async def initialize(self):
+        """Nothing to set up."""
+
+    async def shutdown(self):
+        """Nothing to tear down."""
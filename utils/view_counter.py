@@ -0,0 +1,78 @@
+from typing import Dict, List, Tuple
+
+# Count a view only if this user has not viewed the listing within
+# the dedup window. KEYS: seen, pending, unique, dirty
+RECORD_VIEW_SCRIPT = """
+if redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    redis.call('INCR', KEYS[2])
+    redis.call('PFADD', KEYS[3], ARGV[2])
+    redis.call('SADD', KEYS[4], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+DIRTY_KEY = "views:dirty"
+
+class ViewCounter:
+    def __init__(self, redis, dedup_window: int):
+        self.redis = redis
+        self.dedup_window = dedup_window
+        self._record_view = redis.register_script(RECORD_VIEW_SCRIPT)
+
+    async def record_view(self, listing_id: str, user_id: int) -> bool:
+        """Count a view. Returns False for a repeat view inside the window."""
+        counted = await self._record_view(
+            keys=[
+                f"views:seen:{listing_id}:{user_id}",
+                f"views:pending:{listing_id}",
+                f"views:unique:{listing_id}",
+                DIRTY_KEY
+            ],
+            args=[self.dedup_window, user_id, listing_id]
+        )
+        return bool(counted)
+
+    async def pop_pending(self, limit: int) -> List[Tuple[str, int, int]]:
+        """Take unflushed counts as (listing_id, views, unique_views)."""
+        listing_ids = await self.redis.spop(DIRTY_KEY, limit)
+        if not listing_ids:
+            return []
+
+        # GET and DEL run in one MULTI so no INCR falls between them
+        pipe = self.redis.pipeline(transaction=True)
+        for listing_id in listing_ids:
+            pipe.get(f"views:pending:{listing_id}")
+            pipe.delete(f"views:pending:{listing_id}")
+            pipe.pfcount(f"views:unique:{listing_id}")
+        results = await pipe.execute()
+
+        return [
+            (listing_id, int(results[i * 3] or 0), results[i * 3 + 2])
+            for i, listing_id in enumerate(listing_ids)
+        ]
+
+    async def restore_pending(self, counts: List[Tuple[str, int, int]]):
+        """Put back counts whose flush failed."""
+        pipe = self.redis.pipeline(transaction=False)
+        for listing_id, views, _ in counts:
+            pipe.incrby(f"views:pending:{listing_id}", views)
+            pipe.sadd(DIRTY_KEY, listing_id)
+        await pipe.execute()
+
+    async def get_counts(self, listing_id: str) -> Dict[str, int]:
+        """Get unflushed views and unique viewers of a listing."""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(f"views:pending:{listing_id}")
+        pipe.pfcount(f"views:unique:{listing_id}")
+        pending, unique = await pipe.execute()
+        return {'pending_views': int(pending or 0), 'unique_views': unique}
+
+    async def forget(self, *listing_ids: str):
+        """Drop counters of deleted listings."""
+        if not listing_ids:
+            return
+        keys = []
+        for listing_id in listing_ids:
+            keys.extend((f"views:pending:{listing_id}", f"views:unique:{listing_id}"))
+        await self.redis.delete(*keys)